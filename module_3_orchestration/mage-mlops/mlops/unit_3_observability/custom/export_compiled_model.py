@@ -0,0 +1,49 @@
+from typing import Dict, Tuple, Union
+
+from pandas import Series
+from scipy.sparse._csr import csr_matrix
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction import DictVectorizer
+from xgboost import Booster
+
+from mlops.utils.models.export import log_compiled_model, registered_run_id
+
+if 'custom' not in globals():
+    from mage_ai.data_preparation.decorators import custom
+
+
+@custom
+def export(
+    training_set: Dict[str, Union[Series, csr_matrix]],
+    training_results: Tuple[
+        Union[BaseEstimator, Booster],
+        Union[DictVectorizer, Dict[str, str]],
+    ],
+    **kwargs,
+) -> str:
+    model, _ = training_results
+
+    # Same DictVectorizer the XGBoost exporter hands to online inference.
+    vectorizer = training_set['build'][6]
+
+    # The run this model was trained and logged in: given directly, or the run
+    # behind the registered version the serving alias points at.
+    run_id = kwargs.get('run_id')
+    if not run_id and kwargs.get('model_name'):
+        run_id = registered_run_id(
+            kwargs['model_name'],
+            kwargs.get('model_alias', 'Champion'),
+            tracking_uri=kwargs.get('tracking_uri'),
+        )
+    if not run_id:
+        raise ValueError(
+            'Set the run_id or model_name variable to the training run to attach the compiled model to.'
+        )
+
+    return log_compiled_model(
+        model,
+        vectorizer,
+        run_id,
+        tracking_uri=kwargs.get('tracking_uri'),
+        verbosity=kwargs.get('verbosity', True),
+    )
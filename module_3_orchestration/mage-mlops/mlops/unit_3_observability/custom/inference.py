@@ -3,6 +3,7 @@ from typing import Dict, List, Tuple, Union
 from sklearn.feature_extraction import DictVectorizer
 from xgboost import Booster
 
+from mlops.utils.data_preparation.encoders import compile_vectorizer
 from mlops.utils.data_preparation.feature_engineering import combine_features
 from mlops.utils.models.xgboost import build_data
 
@@ -47,7 +48,7 @@ def predict(
         ]
     
     model, vectorizer = model_settings['xgboost']
-    vectors = vectorizer.transform(inputs)
+    vectors = compile_vectorizer(vectorizer).transform(inputs)
 
     predictions = model.predict(build_data(vectors))
 
@@ -1,5 +1,8 @@
-from typing import Dict, List, Optional, Tuple
+import weakref
+from numbers import Number
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 import scipy
 from sklearn.feature_extraction import DictVectorizer
@@ -20,3 +23,82 @@ def vectorize_features(
         X_val = dv.transform(val_dicts)
 
     return X_train, X_val, dv
+
+
+class FeatureEncoder:
+    """
+    Compiled DictVectorizer.transform for online inference.
+
+    vocabulary_ is split once into per-feature column lookups, so encoding a row is a
+    couple of dict lookups instead of formatting 'feature=value' names. The output
+    matches DictVectorizer.transform: unknown features and categories are dropped and
+    column indices are sorted per row.
+    """
+
+    def __init__(self, dv: DictVectorizer):
+        self.dv = dv
+        self.dtype = dv.dtype
+        self.n_features = len(dv.vocabulary_)
+        self.categorical: Dict[str, Dict[str, int]] = {}
+        self.numerical: Dict[str, int] = {}
+
+        for name, column in dv.vocabulary_.items():
+            feature, separator, value = name.partition(dv.separator)
+            if separator:
+                self.categorical.setdefault(feature, {})[value] = column
+            else:
+                self.numerical[name] = column
+
+    def transform(self, rows: Union[Mapping, List[Mapping]]) -> scipy.sparse.csr_matrix:
+        rows = [rows] if isinstance(rows, Mapping) else rows
+        if len(rows) == 0:
+            raise ValueError('Sample sequence X is empty.')
+
+        categorical = self.categorical
+        numerical = self.numerical
+        dtype = self.dtype
+        indptr = np.empty(len(rows) + 1, dtype=np.intc)
+        indptr[0] = 0
+        indices = []
+        data = []
+        for i, row in enumerate(rows):
+            entries = []
+            for feature, value in row.items():
+                if isinstance(value, str):
+                    column = categorical.get(feature, {}).get(value)
+                    value = 1
+                elif type(value) in (float, int) or value is None or isinstance(value, Number):
+                    column = numerical.get(feature)
+                else:
+                    # Iterable values are expanded by the vectorizer itself.
+                    return self.dv.transform(rows)
+
+                if column is not None:
+                    entries.append((column, value))
+
+            if len(entries) > 1:
+                entries.sort()
+            for column, value in entries:
+                indices.append(column)
+                data.append(value)
+            indptr[i + 1] = len(indices)
+
+        X = scipy.sparse.csr_matrix(
+            (np.array(data, dtype=dtype), np.array(indices, dtype=np.intc), indptr),
+            shape=(len(rows), self.n_features),
+        )
+        X.has_sorted_indices = True
+        return X
+
+
+_encoders: 'weakref.WeakKeyDictionary[DictVectorizer, FeatureEncoder]' = weakref.WeakKeyDictionary()
+
+
+def compile_vectorizer(dv: DictVectorizer) -> FeatureEncoder:
+    # The same vectorizer is reused across inference runs, so compile it once.
+    encoder = _encoders.get(dv)
+    if encoder is None:
+        encoder = FeatureEncoder(dv)
+        _encoders[dv] = encoder
+
+    return encoder
@@ -1,11 +1,37 @@
 from typing import Dict, List, Union
 
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 
 
+def combine_categories(pickup: pd.Series, dropoff: pd.Series) -> pd.Categorical:
+    # 'PU_DO' from the codes of two categoricals: one string per pair that occurs
+    n_dropoff = len(dropoff.cat.categories)
+    pairs, codes = np.unique(
+        pickup.cat.codes.to_numpy(np.int64) * n_dropoff + dropoff.cat.codes.to_numpy(np.int64),
+        return_inverse=True,
+    )
+    names = (
+        pickup.cat.categories.astype(str)[pairs // n_dropoff]
+        + '_'
+        + dropoff.cat.categories.astype(str)[pairs % n_dropoff]
+    )
+    return pd.Categorical.from_codes(codes.ravel(), categories=names)
+
+
 def combine_features(df: Union[List[Dict], DataFrame]) -> Union[List[Dict], DataFrame]:
     if isinstance(df, DataFrame):
-        df['PU_DO'] = df['PULocationID'].astype(str) + '_' + df['DOLocationID'].astype(str)
+        pickup, dropoff = df['PULocationID'], df['DOLocationID']
+        if (
+            isinstance(pickup.dtype, pd.CategoricalDtype)
+            and isinstance(dropoff.dtype, pd.CategoricalDtype)
+            and not pickup.isna().any()
+            and not dropoff.isna().any()
+        ):
+            df['PU_DO'] = combine_categories(pickup, dropoff)
+        else:
+            df['PU_DO'] = pickup.astype(str) + '_' + dropoff.astype(str)
     elif isinstance(df, list) and len(df) >= 1 and isinstance(df[0], dict):
         arr = []
         for row in df:
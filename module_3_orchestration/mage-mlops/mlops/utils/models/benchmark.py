@@ -0,0 +1,124 @@
+"""
+Compare serving a model through mlflow.pyfunc + DictVectorizer with the compiled artifact.
+
+Each path runs in its own Python process so that import time, load time and peak
+memory are measured from a cold interpreter:
+
+    python -m mlops.utils.models.benchmark \
+        --model-uri runs:/<run_id>/models \
+        --dv-path dv.pkl \
+        --compiled-path model.npz \
+        --output benchmark.json
+"""
+import argparse
+import json
+import pickle
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def sample_rows(categorical: Dict[str, List[str]], numerical: List[str], n: int, seed: int = 42) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    columns = {feature: rng.choice(values, n) for feature, values in categorical.items()}
+    columns.update({feature: np.round(rng.gamma(2.0, 2.0, n), 2) for feature in numerical})
+
+    return [
+        {feature: values[i].item() for feature, values in columns.items()}
+        for i in range(n)
+    ]
+
+
+def measure(predict: Callable[[List[Dict]], np.ndarray], rows: List[Dict], requests: int) -> Dict[str, float]:
+    latencies = []
+    for row in rows[:requests]:
+        start = time.perf_counter()
+        predict([row])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    predict(rows)
+    batch_seconds = time.perf_counter() - start
+
+    return dict(
+        single_row_p50_ms=float(np.percentile(latencies, 50) * 1000),
+        single_row_p99_ms=float(np.percentile(latencies, 99) * 1000),
+        batch_rows=len(rows),
+        batch_rows_per_second=len(rows) / batch_seconds,
+    )
+
+
+def run_path(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    start = time.perf_counter()
+    if mode == 'pyfunc':
+        import mlflow
+
+        model = mlflow.pyfunc.load_model(args.model_uri)
+        with open(args.dv_path, 'rb') as file:
+            dv = pickle.load(file)
+
+        def predict(rows: List[Dict]) -> np.ndarray:
+            return model.predict(dv.transform(rows))
+    else:
+        from mlops.utils.models.compiled import CompiledModel
+
+        compiled = CompiledModel.load(args.compiled_path)
+        predict = compiled.predict
+    load_seconds = time.perf_counter() - start
+
+    # Both paths sample from the compiled vocabulary so they score the same rows.
+    from mlops.utils.models.compiled import CompiledModel
+
+    vocabulary = CompiledModel.load(args.compiled_path)
+    rows = sample_rows(
+        {feature: list(values) for feature, values in vocabulary.categorical.items()},
+        list(vocabulary.numerical_slots),
+        args.rows,
+    )
+
+    result = dict(mode=mode, load_seconds=load_seconds)
+    result.update(measure(predict, rows, args.requests))
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result['checksum'] = float(np.sum(predict(rows[:1000])))
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model-uri', required=True)
+    parser.add_argument('--dv-path', required=True)
+    parser.add_argument('--compiled-path', required=True)
+    parser.add_argument('--rows', default=100_000, type=int)
+    parser.add_argument('--requests', default=1_000, type=int)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--mode', choices=['pyfunc', 'compiled'], default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_path(args.mode, args)))
+        return
+
+    results = []
+    for mode in ['pyfunc', 'compiled']:
+        output = subprocess.run(
+            [sys.executable, '-m', 'mlops.utils.models.benchmark', *sys.argv[1:], '--mode', mode],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# Kept byte for byte identical to module_4_deployment/compiled.py, which the
+# prediction service imports without the mlops package; change both together.
+from numbers import Number
+from typing import Dict, List, Mapping, Tuple, Union
+
+import numpy as np
+
+# Rows are traversed through every tree at once, this many rows at a time.
+CHUNK_SIZE = 10_000
+
+
+class CompiledModel:
+    """
+    Self-contained (DictVectorizer, model) pair that only needs NumPy at runtime.
+
+    kind='linear':  prediction = intercept + X @ coef
+    kind='trees':   prediction = init + scale * sum of the leaf reached in every tree
+
+    Trees from sklearn and XGBoost share one flat node layout (feature, threshold,
+    left, right, missing, value) with feature -1 marking a leaf. Rows are not turned
+    into a sparse matrix: each row keeps the column of its category per categorical
+    feature plus its numerical values, which is all a split over one-hot columns needs.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.kind = str(arrays['kind'])
+        self.n_features = int(arrays['n_features'])
+
+        self.categorical: Dict[str, Dict[str, int]] = {}
+        for i, feature in enumerate(arrays['categorical_features'].tolist()):
+            self.categorical[feature] = dict(
+                zip(arrays[f'values_{i}'].tolist(), arrays[f'columns_{i}'].tolist()),
+            )
+        self.categorical_slots = {feature: k for k, feature in enumerate(self.categorical)}
+        self.numerical_slots = {
+            feature: j for j, feature in enumerate(arrays['numerical_features'].tolist())
+        }
+        numerical_columns = arrays['numerical_columns']
+
+        # Which categorical feature or numerical slot each vectorizer column belongs to
+        self.column_is_categorical = np.zeros(self.n_features, dtype=bool)
+        self.column_slot = np.zeros(self.n_features, dtype=np.int64)
+        for feature, columns in self.categorical.items():
+            index = np.fromiter(columns.values(), dtype=np.int64, count=len(columns))
+            self.column_is_categorical[index] = True
+            self.column_slot[index] = self.categorical_slots[feature]
+        self.column_slot[numerical_columns] = np.arange(len(numerical_columns))
+
+        if self.kind == 'trees':
+            self.absent_is_missing = bool(arrays['absent_is_missing'])
+            self.strict = str(arrays['comparison']) == 'lt'
+            self.float32 = bool(arrays['float32'])
+            self._prepare_nodes()
+
+    def _prepare_nodes(self):
+        # Per split node: whether it tests a one-hot column, and for those the child a
+        # row goes to when it has that category (value 1) or not (value 0 or missing).
+        feature = self.arrays['feature']
+        threshold = self.arrays['threshold']
+        left = self.arrays['left']
+        right = self.arrays['right']
+        column = np.where(feature >= 0, feature, 0)
+
+        # Leaves point at slot 0 of both, which exists whatever column 0 is
+        self.node_is_categorical = (feature >= 0) & self.column_is_categorical[column]
+        node_is_numerical = (feature >= 0) & ~self.column_is_categorical[column]
+        self.node_categorical_slot = np.where(self.node_is_categorical, self.column_slot[column], 0)
+        self.node_numerical_slot = np.where(node_is_numerical, self.column_slot[column], 0)
+
+        one_goes_left = 1 < threshold if self.strict else 1 <= threshold
+        zero_goes_left = 0 < threshold if self.strict else 0 <= threshold
+        self.child_if_present = np.where(one_goes_left, left, right)
+        if self.absent_is_missing:
+            self.child_if_absent = self.arrays['missing']
+        else:
+            self.child_if_absent = np.where(zero_goes_left, left, right)
+
+    def encode(self, rows: Union[Mapping, List[Mapping]]) -> Tuple[np.ndarray, np.ndarray]:
+        rows = [rows] if isinstance(rows, Mapping) else rows
+        absent = np.nan if self.kind == 'trees' and self.absent_is_missing else 0.0
+        categories = np.full((len(rows), max(len(self.categorical), 1)), -1, dtype=np.int64)
+        numbers = np.full((len(rows), max(len(self.numerical_slots), 1)), absent, dtype=np.float64)
+
+        for i, row in enumerate(rows):
+            for feature, value in row.items():
+                if isinstance(value, str):
+                    column = self.categorical.get(feature, {}).get(value)
+                    if column is not None:
+                        categories[i, self.categorical_slots[feature]] = column
+                elif (value is None or isinstance(value, Number)) and feature in self.numerical_slots:
+                    numbers[i, self.numerical_slots[feature]] = np.nan if value is None else value
+
+        return categories, numbers
+
+    def predict(self, rows: Union[Mapping, List[Mapping]]) -> np.ndarray:
+        categories, numbers = self.encode(rows)
+        return self.predict_encoded(categories, numbers)
+
+    def predict_encoded(self, categories: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+        if self.kind == 'linear':
+            coef = np.append(self.arrays['coef'], 0.0)
+            numerical_columns = self.arrays['numerical_columns']
+            predictions = float(self.arrays['intercept']) + coef[categories].sum(axis=1)
+            if len(numerical_columns):
+                predictions += numbers[:, :len(numerical_columns)] @ coef[numerical_columns]
+            return predictions
+
+        predictions = np.empty(len(categories), dtype=np.float64)
+        for start in range(0, len(categories), CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            predictions[start:stop] = self._predict_trees(categories[start:stop], numbers[start:stop])
+        return predictions
+
+    def _predict_trees(self, categories: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+        feature = self.arrays['feature']
+        threshold = self.arrays['threshold']
+        left = self.arrays['left']
+        right = self.arrays['right']
+        missing = self.arrays['missing']
+        if self.float32:
+            numbers = numbers.astype(np.float32)
+
+        nodes = np.broadcast_to(self.arrays['roots'], (len(categories), len(self.arrays['roots']))).copy()
+        while True:
+            split = feature[nodes]
+            active = split >= 0
+            if not active.any():
+                break
+
+            present = np.take_along_axis(categories, self.node_categorical_slot[nodes], axis=1) == split
+            categorical_step = np.where(present, self.child_if_present[nodes], self.child_if_absent[nodes])
+
+            value = np.take_along_axis(numbers, self.node_numerical_slot[nodes], axis=1)
+            bound = threshold[nodes]
+            go_left = value < bound if self.strict else value <= bound
+            numerical_step = np.where(np.isnan(value), missing[nodes], np.where(go_left, left[nodes], right[nodes]))
+
+            step = np.where(self.node_is_categorical[nodes], categorical_step, numerical_step)
+            nodes = np.where(active, step, nodes)
+
+        leaves = self.arrays['value'][nodes].sum(axis=1)
+        return float(self.arrays['init']) + float(self.arrays['scale']) * leaves
+
+    def save(self, path: str):
+        np.savez(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledModel':
+        with np.load(path) as artifact:
+            return cls({key: artifact[key] for key in artifact.files})
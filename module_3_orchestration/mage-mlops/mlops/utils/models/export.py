@@ -0,0 +1,227 @@
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+import mlflow
+import numpy as np
+import xgboost as xgb
+from mlflow import MlflowClient
+from sklearn.base import BaseEstimator
+from sklearn.feature_extraction import DictVectorizer
+
+from mlops.utils.logging import DEFAULT_TRACKING_URI
+from mlops.utils.models.compiled import CompiledModel
+
+COMPILED_ARTIFACT_PATH = 'compiled'
+COMPILED_FILENAME = 'model.npz'
+
+# XGBoost objectives whose prediction is the raw sum of leaves (identity link)
+XGBOOST_IDENTITY_OBJECTIVES = [
+    'reg:absoluteerror',
+    'reg:linear',
+    'reg:pseudohubererror',
+    'reg:squarederror',
+]
+
+
+def vocabulary_arrays(dv: DictVectorizer) -> Dict[str, np.ndarray]:
+    categorical: Dict[str, Dict[str, int]] = {}
+    numerical: Dict[str, int] = {}
+    for name, column in dv.vocabulary_.items():
+        feature, separator, value = name.partition(dv.separator)
+        if separator:
+            categorical.setdefault(feature, {})[value] = column
+        else:
+            numerical[name] = column
+
+    arrays = dict(
+        n_features=np.int64(len(dv.vocabulary_)),
+        categorical_features=np.array(list(categorical), dtype=str),
+        numerical_features=np.array(list(numerical), dtype=str),
+        numerical_columns=np.array(list(numerical.values()), dtype=np.int64),
+    )
+    for i, columns in enumerate(categorical.values()):
+        arrays[f'values_{i}'] = np.array(list(columns), dtype=str)
+        arrays[f'columns_{i}'] = np.array(list(columns.values()), dtype=np.int64)
+
+    return arrays
+
+
+def sklearn_tree_nodes(tree, offset: int) -> Dict[str, np.ndarray]:
+    tree_ = tree.tree_
+    is_leaf = tree_.children_left < 0
+    left = np.where(is_leaf, -1, tree_.children_left + offset)
+    right = np.where(is_leaf, -1, tree_.children_right + offset)
+    go_left = getattr(tree_, 'missing_go_to_left', np.zeros(tree_.node_count, dtype=bool))
+
+    return dict(
+        feature=np.where(is_leaf, -1, tree_.feature),
+        threshold=tree_.threshold,
+        left=left,
+        right=right,
+        missing=np.where(go_left.astype(bool), left, right),
+        value=tree_.value[:, 0, 0],
+    )
+
+
+def xgboost_tree_nodes(tree: Dict, offset: int) -> Dict[str, np.ndarray]:
+    nodes = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        nodes[node['nodeid']] = node
+        stack.extend(node.get('children', []))
+
+    count = max(nodes) + 1
+    arrays = dict(
+        feature=np.full(count, -1, dtype=np.int64),
+        threshold=np.zeros(count, dtype=np.float64),
+        left=np.full(count, -1, dtype=np.int64),
+        right=np.full(count, -1, dtype=np.int64),
+        missing=np.full(count, -1, dtype=np.int64),
+        value=np.zeros(count, dtype=np.float64),
+    )
+    for nodeid, node in nodes.items():
+        if 'leaf' in node:
+            arrays['value'][nodeid] = node['leaf']
+            continue
+        # Splits are named f<column> when the DMatrix has no feature names
+        arrays['feature'][nodeid] = int(str(node['split']).lstrip('f'))
+        arrays['threshold'][nodeid] = np.float32(node['split_condition'])
+        arrays['left'][nodeid] = node['yes'] + offset
+        arrays['right'][nodeid] = node['no'] + offset
+        arrays['missing'][nodeid] = node['missing'] + offset
+
+    return arrays
+
+
+def stack_trees(trees: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    roots = np.cumsum([0] + [len(tree['feature']) for tree in trees[:-1]])
+    arrays = {
+        key: np.concatenate([tree[key] for tree in trees])
+        for key in ['feature', 'threshold', 'left', 'right', 'missing', 'value']
+    }
+    arrays['roots'] = roots.astype(np.int64)
+
+    return arrays
+
+
+def compile_sklearn_trees(model: BaseEstimator) -> Tuple[List, float, float]:
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is None:
+        # A single DecisionTreeRegressor
+        return [model], 0.0, 1.0
+
+    estimators = np.ravel(estimators).tolist()
+    learning_rate = getattr(model, 'learning_rate', None)
+    if learning_rate is None:
+        # RandomForestRegressor, ExtraTreesRegressor: average of the trees
+        return estimators, 0.0, 1.0 / len(estimators)
+
+    # GradientBoostingRegressor: initial estimate + learning_rate * sum of the trees
+    init = 0.0
+    if model.init_ != 'zero':
+        init = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+
+    return estimators, init, float(learning_rate)
+
+
+def compile_model(model: Union[BaseEstimator, xgb.Booster], dv: DictVectorizer) -> CompiledModel:
+    arrays = vocabulary_arrays(dv)
+
+    if isinstance(model, xgb.Booster):
+        config = json.loads(model.save_config())
+        objective = config['learner']['objective']['name']
+        booster = config['learner']['gradient_booster']['name']
+        if booster != 'gbtree' or objective not in XGBOOST_IDENTITY_OBJECTIVES:
+            raise ValueError(f'Cannot compile XGBoost {booster} model with objective {objective}.')
+
+        dump = [json.loads(tree) for tree in model.get_dump(dump_format='json')]
+        trees = []
+        offset = 0
+        for tree in dump:
+            nodes = xgboost_tree_nodes(tree, offset)
+            trees.append(nodes)
+            offset += len(nodes['feature'])
+
+        arrays.update(stack_trees(trees))
+        arrays.update(
+            kind=np.array('trees'),
+            comparison=np.array('lt'),
+            absent_is_missing=np.bool_(True),
+            float32=np.bool_(True),
+            init=np.float64(float(config['learner']['learner_model_param']['base_score'].strip('[]'))),
+            scale=np.float64(1.0),
+        )
+    elif hasattr(model, 'coef_') and np.ndim(model.coef_) == 1:
+        arrays.update(
+            kind=np.array('linear'),
+            coef=np.asarray(model.coef_, dtype=np.float64),
+            intercept=np.float64(np.ravel(model.intercept_)[0]),
+        )
+    elif hasattr(model, 'tree_') or hasattr(model, 'estimators_'):
+        estimators, init, scale = compile_sklearn_trees(model)
+        trees = []
+        offset = 0
+        for estimator in estimators:
+            trees.append(sklearn_tree_nodes(estimator, offset))
+            offset += estimator.tree_.node_count
+
+        arrays.update(stack_trees(trees))
+        arrays.update(
+            kind=np.array('trees'),
+            comparison=np.array('le'),
+            absent_is_missing=np.bool_(False),
+            float32=np.bool_(True),
+            init=np.float64(init),
+            scale=np.float64(scale),
+        )
+    else:
+        raise ValueError(f'Cannot compile model of type {model.__class__.__name__}.')
+
+    return CompiledModel(arrays)
+
+
+def export_model(
+    model: Union[BaseEstimator, xgb.Booster],
+    dv: DictVectorizer,
+    path: str,
+) -> CompiledModel:
+    compiled = compile_model(model, dv)
+    compiled.save(path)
+
+    return compiled
+
+
+def registered_run_id(
+    model_name: str,
+    alias: str = 'Champion',
+    tracking_uri: Optional[str] = None,
+) -> str:
+    mlflow.set_tracking_uri(tracking_uri or DEFAULT_TRACKING_URI)
+    return MlflowClient().get_model_version_by_alias(model_name, alias).run_id
+
+
+def log_compiled_model(
+    model: Union[BaseEstimator, xgb.Booster],
+    dv: DictVectorizer,
+    run_id: str,
+    tracking_uri: Optional[str] = None,
+    verbosity: Union[bool, int] = False,
+) -> str:
+    mlflow.set_tracking_uri(tracking_uri or DEFAULT_TRACKING_URI)
+    client = MlflowClient()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        compiled_path = os.path.join(tmp_dir, COMPILED_FILENAME)
+        export_model(model, dv, compiled_path)
+
+        # The training run already holds the MLflow model and dv.pkl, the compiled
+        # artifact goes next to them so a registered version carries all three.
+        client.log_artifact(run_id, compiled_path, artifact_path=COMPILED_ARTIFACT_PATH)
+
+    if verbosity:
+        print(f'Logged compiled {model.__class__.__name__} to run {run_id}.')
+
+    return run_id
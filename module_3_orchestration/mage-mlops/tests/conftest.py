@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The pipeline code imports itself as the mlops package, so do the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
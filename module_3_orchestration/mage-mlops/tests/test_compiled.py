@@ -0,0 +1,93 @@
+import os
+
+import mlflow
+import numpy as np
+import pytest
+import xgboost as xgb
+from mlflow import MlflowClient
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.linear_model import LinearRegression
+
+from mlops.utils.models.compiled import CompiledModel
+from mlops.utils.models.export import COMPILED_ARTIFACT_PATH, COMPILED_FILENAME, export_model, log_compiled_model
+
+
+def trips(n, seed):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for pickup, dropoff, distance in zip(rng.integers(1, 30, n), rng.integers(1, 30, n), rng.exponential(3, n)):
+        rows.append({'PU_DO': f'{pickup}_{dropoff}', 'PULocationID': str(pickup), 'trip_distance': float(distance)})
+    return rows
+
+
+@pytest.fixture(scope='module')
+def training():
+    rows = trips(2000, seed=1)
+    dv = DictVectorizer()
+    X = dv.fit_transform(rows)
+    y = np.array([5 + 3 * row['trip_distance'] + int(row['PULocationID']) % 7 for row in rows])
+    return dv, X, y
+
+
+@pytest.fixture(scope='module')
+def scoring_rows():
+    rows = trips(500, seed=2)
+    # Categories and features the vectorizer never saw, and a missing distance
+    rows[0]['PU_DO'] = 'unseen'
+    rows[1]['weather'] = 'rain'
+    del rows[2]['trip_distance']
+    return rows
+
+
+@pytest.mark.parametrize('model', [
+    LinearRegression(),
+    GradientBoostingRegressor(n_estimators=20, max_depth=4, random_state=0),
+    RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0),
+    ExtraTreesRegressor(n_estimators=10, max_depth=6, random_state=0),
+], ids=lambda model: model.__class__.__name__)
+def test_compiled_sklearn_matches_predict(training, scoring_rows, model, tmp_path):
+    dv, X, y = training
+    model.fit(X, y)
+    path = str(tmp_path / COMPILED_FILENAME)
+    export_model(model, dv, path)
+
+    compiled = CompiledModel.load(path)
+    expected = model.predict(dv.transform(scoring_rows))
+    np.testing.assert_allclose(compiled.predict(scoring_rows), expected, rtol=1e-9, atol=1e-9)
+    assert compiled.predict(scoring_rows[3]) == pytest.approx(expected[3])
+
+
+def test_compiled_xgboost_matches_predict(training, scoring_rows, tmp_path):
+    dv, X, y = training
+    booster = xgb.train(
+        {'objective': 'reg:squarederror', 'max_depth': 6, 'seed': 0},
+        xgb.DMatrix(X, label=y),
+        num_boost_round=30,
+    )
+    path = str(tmp_path / COMPILED_FILENAME)
+    export_model(booster, dv, path)
+
+    compiled = CompiledModel.load(path)
+    expected = booster.predict(xgb.DMatrix(dv.transform(scoring_rows)))
+    # XGBoost sums leaves in float32
+    np.testing.assert_allclose(compiled.predict(scoring_rows), expected, rtol=1e-5, atol=1e-4)
+
+
+def test_log_compiled_model_into_training_run(training, tmp_path):
+    dv, X, y = training
+    model = LinearRegression().fit(X, y)
+    tracking_uri = f'sqlite:///{tmp_path / "mlflow.db"}'
+    mlflow.set_tracking_uri(tracking_uri)
+    client = MlflowClient()
+    experiment_id = client.create_experiment('compiled', artifact_location=str(tmp_path / 'artifacts'))
+    run_id = client.create_run(experiment_id).info.run_id
+
+    assert log_compiled_model(model, dv, run_id, tracking_uri=tracking_uri) == run_id
+
+    # No new run, the artifact sits in the training run
+    assert len(client.search_runs([experiment_id])) == 1
+    path = client.download_artifacts(run_id, f'{COMPILED_ARTIFACT_PATH}/{COMPILED_FILENAME}', str(tmp_path))
+    assert os.path.exists(path)
+    rows = trips(5, seed=3)
+    np.testing.assert_allclose(CompiledModel.load(path).predict(rows), model.predict(dv.transform(rows)))
@@ -0,0 +1,66 @@
+from typing import Dict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+TRIP_COLUMNS = ["PULocationID", "DOLocationID", "trip_distance"]
+
+
+def read_trips(body: bytes) -> pa.Table:
+    """
+    Read an Arrow IPC stream of trips, one or more record batches.
+
+    Location IDs come back as strings and trip_distance as float64. Raises
+    ValueError (pyarrow.ArrowInvalid is one) for a malformed stream, missing
+    columns, nulls, fractional IDs or a non-numeric distance, so the endpoints
+    can answer 400 like for a bad JSON trip.
+    """
+    table = pa.ipc.open_stream(body).read_all()
+    missing = [column for column in TRIP_COLUMNS if column not in table.column_names]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    for column in TRIP_COLUMNS:
+        # NaN counts as missing too, pandas writes missing floats as NaN
+        index = pc.index(pc.is_null(table[column], nan_is_null=True), True).as_py()
+        if index >= 0:
+            raise ValueError(f"trip at index {index}: missing {column}")
+
+    distance = table["trip_distance"]
+    if not (pa.types.is_integer(distance.type) or pa.types.is_floating(distance.type)):
+        raise ValueError(f"trip_distance must be a number, not {distance.type}")
+    return pa.table({
+        "PULocationID": location_strings(table["PULocationID"], "PULocationID"),
+        "DOLocationID": location_strings(table["DOLocationID"], "DOLocationID"),
+        "trip_distance": pc.cast(distance, pa.float64()),
+    })
+
+
+def location_strings(column: pa.ChunkedArray, name: str) -> pa.ChunkedArray:
+    if pa.types.is_floating(column.type):
+        # Float IDs (e.g. from a pandas column with NaN) format as '10', not '10.0'
+        fractional = pc.index(pc.not_equal(pc.floor(column), column), True).as_py()
+        if fractional >= 0:
+            raise ValueError(f"trip at index {fractional}: {name} must be a whole number")
+        column = pc.cast(column, pa.int64())
+    elif not (pa.types.is_integer(column.type) or pa.types.is_string(column.type)):
+        raise ValueError(f"{name} must be an integer, not {column.type}")
+    return pc.cast(column, pa.string())
+
+
+def prepare_columns(table: pa.Table) -> Dict[str, np.ndarray]:
+    # Columnar version of predict.prepare_features, on a table from read_trips
+    pu_do = pc.binary_join_element_wise(table["PULocationID"], table["DOLocationID"], "_")
+    return {
+        "PU_DO": pu_do.to_numpy(zero_copy_only=False),
+        "trip_distance": table["trip_distance"].to_numpy(zero_copy_only=False),
+    }
+
+
+def write_durations(predictions: np.ndarray) -> bytes:
+    table = pa.table({"Duration": pa.array(np.asarray(predictions, dtype=np.float64))})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
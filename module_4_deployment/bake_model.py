@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import mlflow
+from mlflow import MlflowClient
+from mlflow.exceptions import MlflowException
+
+from linear import LinearPredictor
+from model_holder import (
+    COMPILED_FILENAME,
+    DV_FILENAME,
+    LINEAR_FILENAME,
+    METADATA_FILENAME,
+    MODEL_SUBDIR,
+)
+
+# Where the training pipeline logs the NumPy-only artifact next to the model
+COMPILED_ARTIFACT = "compiled/model.npz"
+
+
+def bake(client: MlflowClient, model_name: str, alias: str, output: str) -> dict:
+    """
+    Copy the model behind model_name@alias into output for LocalModelHolder.
+
+    Run this while building the image, or in an init container that shares the
+    directory with the prediction service, so the service starts without the registry.
+    """
+    model_version = client.get_model_version_by_alias(model_name, alias)
+    version, run_id = str(model_version.version), model_version.run_id
+    os.makedirs(output, exist_ok=True)
+
+    model_dir = os.path.join(output, MODEL_SUBDIR)
+    shutil.rmtree(model_dir, ignore_errors=True)
+    mlflow.artifacts.download_artifacts(f"models:/{model_name}/{version}", dst_path=model_dir)
+    client.download_artifacts(run_id, DV_FILENAME, dst_path=output)
+
+    for stale in [COMPILED_FILENAME, LINEAR_FILENAME]:
+        if os.path.exists(os.path.join(output, stale)):
+            os.remove(os.path.join(output, stale))
+
+    with tempfile.TemporaryDirectory() as dst_path:
+        try:
+            compiled_path = client.download_artifacts(run_id, COMPILED_ARTIFACT, dst_path=dst_path)
+            shutil.move(compiled_path, os.path.join(output, COMPILED_FILENAME))
+        except (MlflowException, OSError):
+            print(f"Run {run_id} has no {COMPILED_ARTIFACT}")
+
+    with open(os.path.join(output, DV_FILENAME), "rb") as file:
+        dv = pickle.load(file)
+    try:
+        raw_model = mlflow.pyfunc.load_model(model_dir).get_raw_model()
+        LinearPredictor.compile(dv, raw_model).save(os.path.join(output, LINEAR_FILENAME))
+    except (TypeError, AttributeError):
+        # Not a linear sklearn model, the service falls back to the pyfunc model.
+        pass
+
+    metadata = {
+        "name": model_name,
+        "alias": alias,
+        "version": version,
+        "run_id": run_id,
+        "baked_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(output, METADATA_FILENAME), "w") as file:
+        json.dump(metadata, file, indent=2)
+
+    return metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download a registered model into a local directory")
+    parser.add_argument("output", help="directory to bake the model into, e.g. /app/model")
+    parser.add_argument("--tracking-uri", default=os.getenv("MLFLOW_TRACKING_URI", "http://mlflow_server:5000"))
+    parser.add_argument("--model-name", default="Duration-Prediction-Model")
+    parser.add_argument("--alias", default="Champion")
+    args = parser.parse_args()
+
+    if os.getenv("MINIO_ENDPOINT"):
+        os.environ["MLFLOW_S3_ENDPOINT_URL"] = os.getenv("MINIO_ENDPOINT")
+        os.environ["AWS_ACCESS_KEY_ID"] = os.getenv("ACCESS_KEY")
+        os.environ["AWS_SECRET_ACCESS_KEY"] = os.getenv("SECRET_KEY")
+
+    mlflow.set_tracking_uri(args.tracking_uri)
+    metadata = bake(MlflowClient(args.tracking_uri), args.model_name, args.alias, args.output)
+    print(f"Baked {metadata['name']} version {metadata['version']} ({metadata['alias']}) into {args.output}")
@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+PredictFn = Callable[[List[Dict]], Sequence[Any]]
+
+
+class BatchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    def record(self, batch_size: int, seconds: float):
+        with self._lock:
+            self.batches += 1
+            self.rows += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.last_seconds = seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            batches = self.batches or 1
+            return {
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_size": self.rows / batches,
+                "max_batch_size": self.max_batch_size,
+                "mean_batch_seconds": self.total_seconds / batches,
+                "max_batch_seconds": self.max_seconds,
+                "last_batch_seconds": self.last_seconds,
+            }
+
+
+class DirectDispatcher:
+    """Scores every request on its own thread, one row at a time."""
+
+    name = "direct"
+
+    def __init__(self, predict_fn: PredictFn):
+        self.predict_fn = predict_fn
+        self.stats = BatchStats()
+
+    def submit(self, features: Dict) -> Any:
+        start = time.perf_counter()
+        prediction = self.predict_fn([features])[0]
+        self.stats.record(1, time.perf_counter() - start)
+        return prediction
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests into one vectorized prediction.
+
+    The worker waits for the first row, then keeps collecting until either
+    max_batch_size rows are queued or max_wait_ms has passed, scores the batch with
+    one predict_fn call and hands each caller its own prediction. When that call
+    fails the batch is scored again row by row, so every caller gets its own
+    prediction or its own exception.
+    """
+
+    name = "microbatch"
+
+    def __init__(self, predict_fn: PredictFn, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = BatchStats()
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, features: Dict) -> Any:
+        return self.enqueue(features).result()
+
+    def enqueue(self, features: Dict) -> Future:
+        # Without waiting, so an event loop can await the future instead of holding a thread
+        future: Future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                predictions = self.predict_fn([features for features, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    # One bad row must not fail the requests it was merged with
+                    self._run_rows(batch)
+                    self.stats.record(len(batch), time.perf_counter() - start)
+                continue
+            self.stats.record(len(batch), time.perf_counter() - start)
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+    def _run_rows(self, batch: List[tuple]):
+        for features, future in batch:
+            try:
+                future.set_result(self.predict_fn([features])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+
+def build_dispatcher(kind: str, predict_fn: PredictFn, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+    if kind == DirectDispatcher.name:
+        return DirectDispatcher(predict_fn)
+    if kind == MicroBatcher.name:
+        return MicroBatcher(predict_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    raise ValueError(f"Unknown dispatcher {kind!r}, expected 'direct' or 'microbatch'")
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of predictions keyed by the model version and the feature dict.
+
+    With distance_bucket > 0 the bucketed feature is snapped to the nearest multiple
+    of the bucket before it is used as a key and scored, so every trip in the same
+    bucket gets the same (cached) prediction. With 0 the exact value is the key.
+    The cache empties itself the first time it sees a new model version.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        ttl_seconds: float = 300.0,
+        distance_bucket: float = 0.0,
+        bucketed_feature: str = "trip_distance",
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.distance_bucket = distance_bucket
+        self.bucketed_feature = bucketed_feature
+
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def normalize(self, features: Dict) -> Tuple[Tuple, Dict]:
+        value = features.get(self.bucketed_feature)
+        if self.distance_bucket > 0 and value is not None:
+            features = {
+                **features,
+                self.bucketed_feature: round(value / self.distance_bucket) * self.distance_bucket,
+            }
+        return tuple(sorted(features.items())), features
+
+    def predict(
+        self,
+        version: str,
+        rows: List[Dict],
+        score: Callable[[List[Dict]], np.ndarray],
+    ) -> np.ndarray:
+        rows = [rows] if isinstance(rows, dict) else rows
+        predictions = np.empty(len(rows), dtype=np.float64)
+        missing: Dict[Tuple, Tuple[Dict, List[int]]] = {}
+        now = time.monotonic()
+
+        with self._lock:
+            if version != self.version:
+                if self.version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+            for i, row in enumerate(rows):
+                key, features = self.normalize(row)
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    predictions[i] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, (features, []))[1].append(i)
+                    self.misses += 1
+
+        if not missing:
+            return predictions
+
+        # Score the misses outside the lock, one call for all of them
+        scored = score([features for features, _ in missing.values()])
+        expires = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for (key, (_, positions)), prediction in zip(missing.items(), scored):
+                predictions[positions] = prediction
+                if self.version != version:
+                    continue
+                self._entries[key] = (float(prediction), expires)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return predictions
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,82 @@
+from typing import Dict, Mapping, Union
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+
+def _positions(index: pd.Index, values) -> np.ndarray:
+    # Position of each value in index, -1 where it is not there. Categorical columns
+    # are looked up once per category and gathered by their codes.
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        values = values.array if isinstance(values, pd.Series) else values
+        return np.append(index.get_indexer(values.categories), -1)[values.codes]
+    return index.get_indexer(values)
+
+
+class ColumnarEncoder:
+    """
+    Vectorized DictVectorizer.transform for data that is already in columns.
+
+    dv.transform(df.to_dict(orient="records")) builds a Python dict per row; here each
+    string column is mapped to its one-hot columns with one hash lookup over the whole
+    column (pd.Index.get_indexer) and numerical columns are copied as they are. The CSR
+    matrix is then assembled from a (rows x features) array of column indices, so the
+    result has the same values, indices (sorted per row) and explicit zeros as
+    DictVectorizer: unknown categories and unknown features are dropped. Columns of
+    category dtype (with str categories) are encoded like their string values.
+    """
+
+    def __init__(self, dv):
+        self.dv = dv
+        self.n_features = len(dv.vocabulary_)
+
+        categorical: Dict[str, Dict[str, int]] = {}
+        self.numerical: Dict[str, int] = {}
+        for name, column in dv.vocabulary_.items():
+            feature, separator, value = name.partition(dv.separator)
+            if separator:
+                categorical.setdefault(feature, {})[value] = column
+            else:
+                self.numerical[name] = column
+
+        self._values = {feature: pd.Index(list(columns), dtype=object) for feature, columns in categorical.items()}
+        # Trailing -1 is gathered for values get_indexer does not find
+        self._columns = {
+            feature: np.append(np.fromiter(columns.values(), dtype=np.int64, count=len(columns)), -1)
+            for feature, columns in categorical.items()
+        }
+
+    def transform(self, columns: Mapping[str, Union[pd.Series, np.ndarray]]) -> csr_matrix:
+        n_rows = len(next(iter(columns.values())))
+        indices, data = [], []
+        for feature, values in columns.items():
+            categorical = isinstance(getattr(values, "dtype", None), pd.CategoricalDtype)
+            if not categorical:
+                values = np.asarray(values)
+            if categorical or values.dtype.kind in "OUS":
+                # String columns are one-hot encoded, like DictVectorizer does for str values
+                if feature not in self._values:
+                    continue
+                indices.append(self._columns[feature][_positions(self._values[feature], values)])
+                data.append(np.ones(n_rows, dtype=self.dv.dtype))
+            elif feature in self.numerical:
+                indices.append(np.full(n_rows, self.numerical[feature], dtype=np.int64))
+                data.append(values.astype(self.dv.dtype))
+
+        if not indices:
+            return csr_matrix((n_rows, self.n_features), dtype=self.dv.dtype)
+
+        indices = np.column_stack(indices)
+        data = np.column_stack(data)
+        order = np.argsort(indices, axis=1, kind="stable")
+        indices = np.take_along_axis(indices, order, axis=1)
+        data = np.take_along_axis(data, order, axis=1)
+
+        found = indices >= 0
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(found.sum(axis=1), out=indptr[1:])
+        return csr_matrix(
+            (data[found], indices[found].astype(np.int32), indptr),
+            shape=(n_rows, self.n_features),
+        )
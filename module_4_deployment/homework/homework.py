@@ -1,14 +1,16 @@
 import pickle
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import calendar
 import os
 import sys
 from dotenv import load_dotenv
 load_dotenv()
-from minio import Minio
-from minio.error import S3Error
 import warnings
 warnings.filterwarnings('ignore')
+from encoder import ColumnarEncoder
+from storage import cached_input, open_s3_writer
 
 os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv("MINIO_ENDPOINT")
 os.environ['AWS_ACCESS_KEY_ID'] = os.getenv("ACCESS_KEY")
@@ -26,43 +28,89 @@ with open('model.bin', 'rb') as f_in:
 
 categorical = ['PULocationID', 'DOLocationID']
 
-def read_data(filename):
-    df = pd.read_parquet(filename)
+# dv.transform without building a dict per ride
+encoder = ColumnarEncoder(dv)
+
+# The only input columns scoring needs
+READ_COLUMNS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime'] + categorical
+OUTPUT_SCHEMA = pa.schema([('ride_id', pa.string()), ('predicted_duration', pa.float64())])
+
+def location_categories(values):
+    # Same values as .fillna(-1).astype('int').astype('str'), as a category: one str()
+    # per distinct location instead of one Python string per ride
+    codes, locations = pd.factorize(values.fillna(-1).astype('int'), sort=True)
+    return pd.Categorical.from_codes(codes, categories=locations.astype('str'))
+
+def prepare_data(df):
     df['duration'] = df.tpep_dropoff_datetime - df.tpep_pickup_datetime
     df['duration'] = df.duration.dt.total_seconds() / 60
     df = df[(df.duration >= 1) & (df.duration <= 60)].copy()
-    df[categorical] = df[categorical].fillna(-1).astype('int').astype('str')    
+    for column in categorical:
+        df[column] = location_categories(df[column])
     return df
 
-def upload_to_s3(output_file):
-
-    minio_client = Minio(endpoint,
-        access_key= os.getenv("ACCESS_KEY"),
-        secret_key= os.getenv("SECRET_KEY"),
-        secure= False
-    )
-    source_file = os.path.basename(output_file)
-    month = calendar.month_name[int(os.path.splitext(os.path.basename(output_file))[0].split("-")[-1])]
-    year = int(os.path.splitext(os.path.basename(output_file))[0].split("-")[-2])
-    print(month)
-    print(year)
-
-    bucket_name = "batch-predictions"
-    destination_file = f"{year}/{month}/{source_file}"
-
-    found = minio_client.bucket_exists(bucket_name)
-    if not found:
-        minio_client.make_bucket(bucket_name)
-        print("Created bucket", bucket_name)
+def read_data(filename):
+    # Downloaded once into the local input cache, then memory mapped
+    df = pd.read_parquet(cached_input(filename), memory_map=True)
+    return prepare_data(df)
+
+def read_data_batches(filename):
+    # One row group at a time, only READ_COLUMNS; the index keeps counting across
+    # row groups so ride ids match read_data(). Without the input cache, URLs are
+    # read with range requests.
+    filename = cached_input(filename)
+    if '://' in filename:
+        import fsspec
+        f_in = fsspec.open(filename, 'rb').open()
     else:
-        print("Bucket", bucket_name, "already exists")
-
-    minio_client.fput_object(
-        bucket_name, destination_file,output_file,
-    )
-    print(
-        source_file, "successfully uploaded as object",
-        destination_file, "to bucket", bucket_name,
+        f_in = pa.memory_map(filename)
+    with f_in:
+        parquet_file = pq.ParquetFile(f_in)
+        offset = 0
+        for i in range(parquet_file.num_row_groups):
+            df = parquet_file.read_row_group(i, columns=READ_COLUMNS).to_pandas()
+            df.index += offset
+            offset += len(df)
+            yield prepare_data(df)
+
+def predict_streaming(input_file, output_file, year, month):
+    # Peak memory is one row group of the input instead of the whole month
+    # Mean and sum of squared deviations merged batch by batch (Chan et al.), which
+    # never goes negative like sum of squares minus squared mean can
+    rows, mean, m2 = 0, 0.0, 0.0
+    with open_output(output_file) as f_out, pq.ParquetWriter(f_out, OUTPUT_SCHEMA, compression='none') as writer:
+        for df in read_data_batches(input_file):
+            if df.empty:
+                continue
+            X_val = encoder.transform({column: df[column] for column in categorical})
+            y_pred = lr.predict(X_val)
+            ride_id = f'{year:04d}/{month:02d}_' + df.index.astype('str')
+            writer.write_table(pa.table({'ride_id': ride_id, 'predicted_duration': y_pred}, schema=OUTPUT_SCHEMA))
+            batch_mean = float(y_pred.mean())
+            delta = batch_mean - mean
+            merged = rows + len(y_pred)
+            mean += delta * len(y_pred) / merged
+            m2 += float(((y_pred - batch_mean) ** 2).sum()) + delta ** 2 * rows * len(y_pred) / merged
+            rows = merged
+
+    if rows == 0:
+        # An empty month, or no ride between 1 and 60 minutes: the output has no rows
+        print("No rides to score, the predictions file is empty")
+        return
+    print("Standard Deviation of Predictions:",(m2 / rows) ** 0.5)
+    print("Mean of Predictions:",mean)
+
+def output_path(year, month):
+    return f's3://batch-predictions/{year}/{calendar.month_name[month]}/batch-{year:04d}-{month:02d}.parquet'
+
+def open_output(output_file):
+    # Uploaded to MinIO in parts while the parquet file is being written,
+    # with one client per process instead of one per upload
+    return open_s3_writer(
+        output_file,
+        endpoint_url=f'http://{endpoint}',
+        aws_access_key_id=os.getenv("ACCESS_KEY"),
+        aws_secret_access_key=os.getenv("SECRET_KEY"),
     )
 
 def main():
@@ -76,12 +124,16 @@ def main():
     except Exception as e:
         print("Entered year or month is wrong. Please check the data")
         print(e)
-    output_file = f'output/batch-{year:04d}-{month:02d}.parquet'
-    
+    output_file = output_path(year, month)
+
+    if '--streaming' in sys.argv[3:]:
+        predict_streaming(input_file, output_file, year, month)
+        print("Predictions uploaded to", output_file)
+        return
+
     df = read_data(input_file)
     df['ride_id'] = f'{year:04d}/{month:02d}_' + df.index.astype('str')
-    dicts = df[categorical].to_dict(orient='records')
-    X_val = dv.transform(dicts)
+    X_val = encoder.transform({column: df[column] for column in categorical})
     y_pred = lr.predict(X_val)
 
     print("Standard Deviation of Predictions:",y_pred.std())
@@ -91,17 +143,14 @@ def main():
     df_result['ride_id'] = df['ride_id']
     df_result['predicted_duration'] = y_pred
 
-    df_result.to_parquet(
-        output_file,
-        engine='pyarrow',
-        compression=None,
-        index=False
-    )
-
-    try:
-        upload_to_s3(output_file)
-    except S3Error as exc:
-        print("error occurred.", exc)
+    with open_output(output_file) as f_out:
+        df_result.to_parquet(
+            f_out,
+            engine='pyarrow',
+            compression=None,
+            index=False
+        )
+    print("Predictions uploaded to", output_file)
 
 if __name__=="__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import argparse
+import json
+import pickle
+from typing import Dict, List, Mapping, Union
+
+import numpy as np
+import pandas as pd
+
+
+def _positions(index: pd.Index, values) -> np.ndarray:
+    # Position of each value in index, -1 where it is not there. Categorical columns
+    # are looked up once per category and gathered by their codes.
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        values = values.array if isinstance(values, pd.Series) else values
+        return np.append(index.get_indexer(values.categories), -1)[values.codes]
+    return index.get_indexer(values)
+
+
+class LinearPredictor:
+    """
+    A fitted (DictVectorizer, linear model) pair compiled into coefficient lookups.
+
+    For a one-hot encoded linear model the prediction is
+    intercept + sum(coef[feature=value] for categorical features)
+            + sum(coef[feature] * value for numerical features),
+    so scoring needs neither the vectorizer nor a sparse matrix. Each categorical
+    feature keeps its known values next to their coefficients plus a trailing 0.0
+    that unknown values are gathered from, matching DictVectorizer dropping them.
+    """
+
+    def __init__(
+        self,
+        intercept: float,
+        categorical: Dict[str, Dict[str, float]],
+        numerical: Dict[str, float],
+    ):
+        self.intercept = float(intercept)
+        self.categorical = categorical
+        self.numerical = numerical
+
+        self._values = {feature: pd.Index(list(coefs), dtype=object) for feature, coefs in categorical.items()}
+        self._coefs = {
+            feature: np.append(np.array(list(coefs.values()), dtype=np.float64), 0.0)
+            for feature, coefs in categorical.items()
+        }
+
+    @classmethod
+    def compile(cls, dv, model) -> "LinearPredictor":
+        coef = getattr(model, "coef_", None)
+        if coef is None or np.ndim(coef) != 1 or len(coef) != len(dv.vocabulary_):
+            raise TypeError(f"{type(model).__name__} is not a single-output linear model over this vectorizer")
+
+        categorical: Dict[str, Dict[str, float]] = {}
+        numerical: Dict[str, float] = {}
+        for name, column in dv.vocabulary_.items():
+            feature, separator, value = name.partition(dv.separator)
+            if separator:
+                categorical.setdefault(feature, {})[value] = float(coef[column])
+            else:
+                numerical[name] = float(coef[column])
+
+        return cls(float(np.ravel(model.intercept_)[0]), categorical, numerical)
+
+    def predict(self, rows: Union[Mapping, List[Mapping]]) -> np.ndarray:
+        # Row-at-a-time scoring for online requests, same input as DictVectorizer
+        rows = [rows] if isinstance(rows, Mapping) else rows
+        predictions = np.empty(len(rows), dtype=np.float64)
+        for i, row in enumerate(rows):
+            y = self.intercept
+            for feature, value in row.items():
+                if isinstance(value, str):
+                    y += self.categorical.get(feature, {}).get(value, 0.0)
+                elif feature in self.numerical:
+                    y += self.numerical[feature] * (np.nan if value is None else value)
+            predictions[i] = y
+        return predictions
+
+    def predict_columns(self, columns: Mapping[str, Union[pd.Series, np.ndarray]]) -> np.ndarray:
+        # Vectorized scoring: a hash lookup per categorical column, then gather + FMA
+        n_rows = len(next(iter(columns.values())))
+        predictions = np.full(n_rows, self.intercept, dtype=np.float64)
+        for feature, values in columns.items():
+            if feature in self.categorical:
+                predictions += self._coefs[feature][_positions(self._values[feature], values)]
+            elif feature in self.numerical:
+                predictions += self.numerical[feature] * np.asarray(values, dtype=np.float64)
+        return predictions
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            intercept=np.float64(self.intercept),
+            numerical=json.dumps(self.numerical),
+            categorical_features=np.array(list(self.categorical), dtype=str),
+            **{
+                f"values_{i}": np.array(list(coefs), dtype=str)
+                for i, coefs in enumerate(self.categorical.values())
+            },
+            **{
+                f"coefs_{i}": np.array(list(coefs.values()), dtype=np.float64)
+                for i, coefs in enumerate(self.categorical.values())
+            },
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LinearPredictor":
+        with np.load(path) as artifact:
+            categorical = {
+                feature: dict(zip(artifact[f"values_{i}"].tolist(), artifact[f"coefs_{i}"].tolist()))
+                for i, feature in enumerate(artifact["categorical_features"].tolist())
+            }
+            return cls(
+                float(artifact["intercept"]),
+                categorical,
+                json.loads(str(artifact["numerical"])),
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a pickled (DictVectorizer, linear model) pair")
+    parser.add_argument("model", help="pickle with the (dv, model) tuple, e.g. model.bin")
+    parser.add_argument("output", help="where to write the compiled .npz artifact")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f_in:
+        dv, model = pickle.load(f_in)
+    LinearPredictor.compile(dv, model).save(args.output)
+    print(f"Saved the linear model lookup to {args.output}")
@@ -0,0 +1,176 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import requests
+
+TRIP_COLUMNS = ["PULocationID", "DOLocationID", "trip_distance"]
+DEFAULT_DATA = "https://d37ci6vzurychx.cloudfront.net/trip-data/yellow_tripdata_2023-03.parquet"
+
+
+def sample_trips(filename: str, n: int, seed: int = 42) -> List[Dict]:
+    # Same trips the model is trained and scored on: 1 to 60 minute rides
+    df = pd.read_parquet(filename, columns=TRIP_COLUMNS + ["tpep_pickup_datetime", "tpep_dropoff_datetime"])
+    duration = (df.tpep_dropoff_datetime - df.tpep_pickup_datetime).dt.total_seconds() / 60
+    df = df[(duration >= 1) & (duration <= 60)][TRIP_COLUMNS].dropna()
+    df = df.sample(n=min(n, len(df)), random_state=seed)
+    return [
+        {"PULocationID": int(pu), "DOLocationID": int(do), "trip_distance": float(distance)}
+        for pu, do, distance in df.itertuples(index=False)
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, latency: float, status: str):
+        with self._lock:
+            self.latencies.append(latency)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class LoadGenerator:
+    """
+    Replays trips against one endpoint of the prediction service.
+
+    closed loop: `concurrency` clients each send their next request as soon as the
+    previous one is answered, which measures the maximum throughput.
+    open loop: requests are scheduled at a fixed `rps` whether or not earlier ones
+    have finished, and latency is measured from the scheduled time, so a service
+    that falls behind shows up as growing latency instead of a lower request rate.
+    """
+
+    def __init__(self, url: str, endpoint: str, trips: List[Dict], batch_size: int = 1):
+        self.url = url.rstrip("/")
+        self.endpoint = endpoint
+        self.trips = trips
+        self.batch_size = batch_size
+        self.recorder = Recorder()
+        self._local = threading.local()
+        self._next = 0
+        self._next_lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def payload(self):
+        with self._next_lock:
+            start = self._next
+            self._next = (self._next + self.batch_size) % len(self.trips)
+        # Batch endpoints take a list of trips, every other endpoint one trip
+        if not self.endpoint.endswith("/batch"):
+            return self.trips[start]
+        return [self.trips[(start + i) % len(self.trips)] for i in range(self.batch_size)]
+
+    def send(self, scheduled: Optional[float] = None):
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = self.session().post(f"{self.url}{self.endpoint}", json=self.payload(), timeout=30)
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        self.recorder.record(time.perf_counter() - start, status)
+
+    def closed_loop(self, concurrency: int, duration: float):
+        deadline = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def open_loop(self, rps: float, duration: float, max_in_flight: int):
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            start = time.perf_counter()
+            for i in range(int(rps * duration)):
+                scheduled = start + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, scheduled)
+
+
+def report(recorder: Recorder, seconds: float, batch_size: int, config: Dict) -> Dict:
+    latencies = np.array(recorder.latencies) * 1000
+    requests_total = len(latencies)
+    errors = sum(count for status, count in recorder.statuses.items() if not status.startswith("2"))
+    percentiles = np.percentile(latencies, [50, 95, 99]) if requests_total else [float("nan")] * 3
+    return {
+        "config": config,
+        "requests": requests_total,
+        "seconds": seconds,
+        "throughput_rps": requests_total / seconds,
+        "throughput_rows_per_second": requests_total * batch_size / seconds,
+        "latency_ms": {
+            "p50": float(percentiles[0]),
+            "p95": float(percentiles[1]),
+            "p99": float(percentiles[2]),
+            "max": float(latencies.max()) if requests_total else float("nan"),
+        },
+        "error_rate": errors / requests_total if requests_total else 0.0,
+        "statuses": recorder.statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ride duration prediction service")
+    parser.add_argument("--url", default="http://localhost:9090")
+    parser.add_argument("--endpoint", default="/predict", help="/predict, /models/<name>/<alias>/predict or their /batch variants")
+    parser.add_argument("--data", default=DEFAULT_DATA, help="NYC taxi parquet file (path or URL) to sample trips from")
+    parser.add_argument("--trips", default=10000, type=int, help="how many trips to sample and replay")
+    parser.add_argument("--batch-size", default=1, type=int, help="trips per request for batch endpoints")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", default=8, type=int, help="clients in closed loop mode")
+    parser.add_argument("--rps", default=100.0, type=float, help="target requests per second in open loop mode")
+    parser.add_argument("--max-in-flight", default=256, type=int, help="open loop connections")
+    parser.add_argument("--duration", default=30.0, type=float, help="seconds to run, after a 2 second warm-up")
+    parser.add_argument("--slo-p99-ms", default=None, type=float, help="exit with 1 when p99 latency is above it")
+    parser.add_argument("--max-error-rate", default=0.0, type=float)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    trips = sample_trips(args.data, args.trips)
+    generator = LoadGenerator(args.url, args.endpoint, trips, args.batch_size)
+
+    # Warm up connections and the service, then start counting from scratch
+    generator.closed_loop(min(args.concurrency, 4), 2.0)
+    generator.recorder = Recorder()
+
+    start = time.perf_counter()
+    if args.mode == "closed":
+        generator.closed_loop(args.concurrency, args.duration)
+    else:
+        generator.open_loop(args.rps, args.duration, args.max_in_flight)
+    seconds = time.perf_counter() - start
+
+    config = {key: value for key, value in vars(args).items() if key != "output"}
+    result = report(generator.recorder, seconds, args.batch_size, config)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    failed = result["error_rate"] > args.max_error_rate
+    if args.slo_p99_ms is not None:
+        failed = failed or result["latency_ms"]["p99"] > args.slo_p99_ms
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
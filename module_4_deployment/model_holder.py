@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+# mlflow, sklearn and pandas take seconds to import, so they are only imported by
+# the code paths that need them. A baked compiled model only needs NumPy.
+if TYPE_CHECKING:
+    from mlflow import MlflowClient
+
+    from compiled import CompiledModel
+    from encoder import FeatureEncoder
+    from linear import LinearPredictor
+
+# Files written by bake_model.py
+METADATA_FILENAME = "model.json"
+MODEL_SUBDIR = "model"
+DV_FILENAME = "dv.pkl"
+COMPILED_FILENAME = "compiled.npz"
+LINEAR_FILENAME = "linear.npz"
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    alias: str
+    version: str
+    run_id: str
+    model: Any
+    dv: Any
+    encoder: Optional["FeatureEncoder"]
+    linear: Optional["LinearPredictor"] = None
+    compiled: Optional["CompiledModel"] = None
+
+
+class VectorizerCache:
+    """
+    Hands out one FeatureEncoder (and its DictVectorizer) per distinct dv.pkl.
+
+    Models trained on the same prepared data log byte-identical vectorizers, so
+    hosting several of them keeps a single copy. An entry lives as long as a loaded
+    model still references its encoder.
+    """
+
+    def __init__(self):
+        self._encoders: "weakref.WeakValueDictionary[str, FeatureEncoder]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def load(self, data: bytes) -> "FeatureEncoder":
+        from encoder import FeatureEncoder
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            encoder = self._encoders.get(digest)
+            if encoder is None:
+                encoder = FeatureEncoder(pickle.loads(data))
+                self._encoders[digest] = encoder
+            return encoder
+
+    def __len__(self) -> int:
+        return len(self._encoders)
+
+
+class ModelHolder:
+    """
+    Keeps the model behind a registry alias and its DictVectorizer in memory.
+
+    Requests read the current LoadedModel with get(); a background thread polls the
+    alias and swaps in a freshly loaded LoadedModel when it points to a new version.
+    Model and vectorizer are always swapped together, so a request never sees a
+    model from one version with the vectorizer of another. When a warmup callable is
+    given, every newly loaded version is passed through it before it is swapped in.
+    """
+
+    def __init__(
+        self,
+        client: "MlflowClient",
+        model_name: str,
+        alias: str,
+        poll_interval: float = 30.0,
+        linear_fast_path: bool = True,
+        warmup: Optional[Callable[[LoadedModel], Any]] = None,
+        vectorizers: Optional[VectorizerCache] = None,
+    ):
+        self.client = client
+        self.model_name = model_name
+        self.alias = alias
+        self.poll_interval = poll_interval
+        self.linear_fast_path = linear_fast_path
+        self.warmup = warmup
+        self.vectorizers = vectorizers
+
+        self._current: Optional[LoadedModel] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> LoadedModel:
+        current = self._current
+        if current is None:
+            raise RuntimeError(f"Model {self.model_name}@{self.alias} is not loaded yet")
+        return current
+
+    def peek(self) -> Optional[LoadedModel]:
+        # None until the first version is loaded and warmed up
+        return self._current
+
+    def refresh(self) -> bool:
+        # Only one reload at a time; readers keep using the old version until the swap.
+        with self._reload_lock:
+            model_version = self.client.get_model_version_by_alias(self.model_name, self.alias)
+            current = self._current
+            if current is not None and current.version == str(model_version.version):
+                return False
+
+            self._swap(self._load(str(model_version.version), model_version.run_id))
+            return True
+
+    def _swap(self, loaded: LoadedModel):
+        if self.warmup is not None:
+            self.warmup(loaded)
+        self._current = loaded
+        print(f"Serving {loaded.name} version {loaded.version} ({loaded.alias})")
+
+    def start(self) -> "ModelHolder":
+        self.refresh()
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._poll, name=f"model-holder-{self.alias}", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def start_in_background(self) -> "ModelHolder":
+        # Lets the server accept connections (and answer readiness probes) while the
+        # first version loads; retries until it succeeds or stop() is called.
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.start()
+                    return
+                except Exception as e:
+                    print(f"Could not load {self.model_name}@{self.alias}: {e}")
+                    self._stop.wait(max(self.poll_interval, 1.0))
+
+        threading.Thread(target=run, name=f"model-loader-{self.alias}", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep serving the loaded version if the registry is unreachable.
+                print(f"Could not refresh {self.model_name}@{self.alias}: {e}")
+
+    def _load(self, version: str, run_id: str) -> LoadedModel:
+        import mlflow
+
+        # Load by version rather than alias so the model matches the version we resolved.
+        model = mlflow.pyfunc.load_model(f"models:/{self.model_name}/{version}")
+        with tempfile.TemporaryDirectory() as dst_path:
+            dv_path = self.client.download_artifacts(run_id, "dv.pkl", dst_path=dst_path)
+            print(f"Downloading the dict vectorizer to {dv_path}")
+            with open(dv_path, 'rb') as file:
+                data = file.read()
+
+        if self.vectorizers is not None:
+            encoder = self.vectorizers.load(data)
+            return self._pyfunc_model(version, run_id, model, encoder.dv, encoder)
+        return self._pyfunc_model(version, run_id, model, pickle.loads(data))
+
+    def _pyfunc_model(self, version: str, run_id: str, model, dv, encoder=None) -> LoadedModel:
+        from encoder import FeatureEncoder
+
+        return LoadedModel(
+            name=self.model_name,
+            alias=self.alias,
+            version=version,
+            run_id=run_id,
+            model=model,
+            dv=dv,
+            encoder=encoder if encoder is not None else FeatureEncoder(dv),
+            linear=self._compile_linear(model, dv),
+        )
+
+    def _compile_linear(self, model, dv) -> Optional["LinearPredictor"]:
+        if not self.linear_fast_path:
+            return None
+        try:
+            from linear import LinearPredictor
+
+            return LinearPredictor.compile(dv, model.get_raw_model())
+        except Exception:
+            # Not a linear sklearn model, keep scoring through the pyfunc model.
+            return None
+
+
+class LocalModelHolder(ModelHolder):
+    """
+    Serves a model baked into a local directory by bake_model.py instead of the registry.
+
+    The directory is read once and there is no polling, so a new version means a new
+    image (or init step). The cheapest artifact present is used: compiled.npz (NumPy
+    only), then linear.npz when the linear fast path is on, then the MLflow model and
+    dv.pkl through mlflow.pyfunc.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        linear_fast_path: bool = True,
+        compiled: bool = True,
+        warmup: Optional[Callable[[LoadedModel], Any]] = None,
+    ):
+        with open(os.path.join(model_dir, METADATA_FILENAME)) as file:
+            self.metadata = json.load(file)
+        super().__init__(
+            None,
+            self.metadata["name"],
+            self.metadata["alias"],
+            poll_interval=0,
+            linear_fast_path=linear_fast_path,
+            warmup=warmup,
+        )
+        self.model_dir = model_dir
+        self.compiled = compiled
+
+    def refresh(self) -> bool:
+        with self._reload_lock:
+            if self._current is not None:
+                return False
+            self._swap(self._load(str(self.metadata["version"]), self.metadata["run_id"]))
+            return True
+
+    def _load(self, version: str, run_id: str) -> LoadedModel:
+        compiled_path = os.path.join(self.model_dir, COMPILED_FILENAME)
+        linear_path = os.path.join(self.model_dir, LINEAR_FILENAME)
+
+        if self.compiled and os.path.exists(compiled_path):
+            from compiled import CompiledModel
+
+            return LoadedModel(
+                self.model_name, self.alias, version, run_id,
+                model=None, dv=None, encoder=None, compiled=CompiledModel.load(compiled_path),
+            )
+        if self.linear_fast_path and os.path.exists(linear_path):
+            from linear import LinearPredictor
+
+            return LoadedModel(
+                self.model_name, self.alias, version, run_id,
+                model=None, dv=None, encoder=None, linear=LinearPredictor.load(linear_path),
+            )
+
+        import mlflow
+
+        model = mlflow.pyfunc.load_model(os.path.join(self.model_dir, MODEL_SUBDIR))
+        with open(os.path.join(self.model_dir, DV_FILENAME), "rb") as file:
+            dv = pickle.load(file)
+        return self._pyfunc_model(version, run_id, model, dv)
@@ -0,0 +1,172 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from model_holder import LoadedModel, ModelHolder, VectorizerCache
+
+if TYPE_CHECKING:
+    from mlflow import MlflowClient
+
+
+class ModelNotFound(LookupError):
+    pass
+
+
+class ModelUnavailable(RuntimeError):
+    # A hosted model that could not be loaded (registry or network error) or is still loading
+    pass
+
+
+@dataclass
+class ManagedModel:
+    holder: ModelHolder
+    pinned: bool = False
+    size_bytes: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    load_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def estimate_bytes(loaded: LoadedModel) -> int:
+    # Serialized size of the model itself; vectorizers are shared and not counted
+    target = loaded.compiled or loaded.linear or loaded.model
+    try:
+        target = target.get_raw_model()
+    except AttributeError:
+        pass
+    try:
+        return len(pickle.dumps(target, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ModelManager:
+    """
+    Hosts several registered models (name@alias) in one process.
+
+    Only the models in allowed (and those added with add()) are served, so clients
+    can not make the process load arbitrary registry models. An allowed model is
+    loaded from the registry on its first request and then hot reloaded like the
+    default model. Vectorizers with identical dv.pkl bytes are shared.
+    When the estimated size of the loaded models goes over memory_budget_bytes the
+    least recently used ones are unloaded; pinned models (the default one) never are.
+    """
+
+    def __init__(
+        self,
+        client: Optional["MlflowClient"],
+        poll_interval: float = 30.0,
+        linear_fast_path: bool = True,
+        warmup: Optional[Callable[[LoadedModel], Any]] = None,
+        memory_budget_bytes: int = 0,
+        allowed: Optional[Set[Tuple[str, str]]] = None,
+        vectorizers: Optional[VectorizerCache] = None,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.linear_fast_path = linear_fast_path
+        self.warmup = warmup
+        self.memory_budget_bytes = memory_budget_bytes
+        self.allowed = frozenset(allowed or ())
+        self.vectorizers = vectorizers if vectorizers is not None else VectorizerCache()
+        self.evictions = 0
+
+        self._models: "OrderedDict[Tuple[str, str], ManagedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, holder: ModelHolder):
+        # A holder started elsewhere, e.g. the default model of predict.py; never evicted
+        with self._lock:
+            self._models[(holder.model_name, holder.alias)] = ManagedModel(holder, pinned=True)
+
+    def get(self, name: str, alias: str) -> LoadedModel:
+        key = (name, alias)
+        with self._lock:
+            managed = self._models.get(key)
+            if managed is None:
+                if self.client is None or key not in self.allowed:
+                    raise ModelNotFound(f"{name}@{alias} is not hosted here")
+                holder = ModelHolder(
+                    self.client,
+                    name,
+                    alias,
+                    poll_interval=self.poll_interval,
+                    linear_fast_path=self.linear_fast_path,
+                    warmup=self.warmup,
+                    vectorizers=self.vectorizers,
+                )
+                managed = self._models[key] = ManagedModel(holder)
+            self._models.move_to_end(key)
+            managed.last_used = time.monotonic()
+
+        if managed.pinned:
+            # Started by its owner, possibly still loading in the background
+            loaded = managed.holder.peek()
+            if loaded is None:
+                raise ModelUnavailable(f"{name}@{alias} is not loaded yet")
+            if not managed.size_bytes:
+                managed.size_bytes = estimate_bytes(loaded)
+            return loaded
+
+        # Loads of different models run in parallel, requests for one model wait for it
+        with managed.load_lock:
+            if managed.holder.peek() is None:
+                try:
+                    managed.holder.start()
+                except Exception as e:
+                    with self._lock:
+                        if self._models.get(key) is managed:
+                            del self._models[key]
+                    raise ModelUnavailable(f"Could not load {name}@{alias}: {e}") from e
+                managed.size_bytes = self._size(managed.holder)
+                self._evict(keep=key)
+            return managed.holder.get()
+
+    def _size(self, holder: ModelHolder) -> int:
+        loaded = holder.peek()
+        return estimate_bytes(loaded) if loaded is not None else 0
+
+    def _evict(self, keep: Tuple[str, str]):
+        if self.memory_budget_bytes <= 0:
+            return
+        evicted: List[ManagedModel] = []
+        with self._lock:
+            total = sum(managed.size_bytes for managed in self._models.values())
+            # OrderedDict order is least recently used first
+            for key, managed in list(self._models.items()):
+                if total <= self.memory_budget_bytes:
+                    break
+                if key == keep or managed.pinned or managed.holder.peek() is None:
+                    continue
+                del self._models[key]
+                total -= managed.size_bytes
+                evicted.append(managed)
+                self.evictions += 1
+        for managed in evicted:
+            # In-flight requests keep their LoadedModel until they finish
+            managed.holder.stop()
+            print(f"Unloaded {managed.holder.model_name}@{managed.holder.alias} to stay within the memory budget")
+
+    def as_dict(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            models = []
+            for (name, alias), managed in self._models.items():
+                loaded = managed.holder.peek()
+                models.append({
+                    "name": name,
+                    "alias": alias,
+                    "version": loaded.version if loaded is not None else None,
+                    "pinned": managed.pinned,
+                    "size_bytes": managed.size_bytes,
+                    "idle_seconds": now - managed.last_used,
+                })
+            return {
+                "models": models,
+                "total_bytes": sum(model["size_bytes"] for model in models),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "shared_vectorizers": len(self.vectorizers),
+                "evictions": self.evictions,
+            }
@@ -1,15 +1,21 @@
-import pandas as pd
-from flask import Flask,jsonify,request
-import mlflow
+from flask import Flask,Response,g,jsonify,request
 import os
-import pickle
-from mlflow import MlflowClient
+import json
+import time
+from model_holder import LocalModelHolder, ModelHolder, VectorizerCache
+from model_manager import ModelManager, ModelNotFound, ModelUnavailable
+from batching import build_dispatcher
+from cache import PredictionCache
+from shadow import ShadowScorer
+from metrics import CONTENT_TYPE, SIZE_BUCKETS, Registry
 from dotenv import load_dotenv
 load_dotenv()
 
-os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv("MINIO_ENDPOINT")
-os.environ['AWS_ACCESS_KEY_ID'] = os.getenv("ACCESS_KEY")
-os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv("SECRET_KEY")
+# Only needed when the model is read from the registry
+if os.getenv("MINIO_ENDPOINT"):
+    os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv("MINIO_ENDPOINT")
+    os.environ['AWS_ACCESS_KEY_ID'] = os.getenv("ACCESS_KEY")
+    os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv("SECRET_KEY")
 
 # Use below setting for local run
 # MLFLOW_TRACKING_URI="http://0.0.0.0:5000"
@@ -17,26 +23,87 @@ os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv("SECRET_KEY")
 # Use below setting for Docker image
 MLFLOW_TRACKING_URI="http://mlflow_server:5000"
 
-mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-client = MlflowClient(MLFLOW_TRACKING_URI)
-
 MODEL_NAME = "Duration-Prediction-Model"
 MODEL_VERSION_ALIAS = "Champion"
 
+# A directory written by bake_model.py; when set the registry (and mlflow) is not used
+MODEL_DIR = os.getenv("MODEL_DIR", "")
+# Score with the baked NumPy-only compiled model when the directory has one
+COMPILED_MODEL = os.getenv("COMPILED_MODEL", "1") == "1"
+# Load the model in a background thread so the server is up (and not ready) meanwhile
+MODEL_LOAD_ASYNC = os.getenv("MODEL_LOAD_ASYNC", "0") == "1"
+
+# How often the registry alias is checked for a new version; 0 disables hot reload
+MODEL_POLL_INTERVAL_SECONDS = float(os.getenv("MODEL_POLL_INTERVAL_SECONDS", "30"))
+
+# Linear models are scored from their coefficients instead of the pyfunc model
+LINEAR_FAST_PATH = os.getenv("LINEAR_FAST_PATH", "1") == "1"
+
+# Single-row /predict requests are scored directly, or coalesced into small batches
+# with PREDICT_DISPATCHER=microbatch
+PREDICT_DISPATCHER = os.getenv("PREDICT_DISPATCHER", "direct")
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Optional LRU/TTL cache of predictions, disabled when PREDICTION_CACHE_SIZE is 0.
+# A non-zero PREDICTION_CACHE_DISTANCE_BUCKET scores trip_distance rounded to that bucket
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300"))
+PREDICTION_CACHE_DISTANCE_BUCKET = float(os.getenv("PREDICTION_CACHE_DISTANCE_BUCKET", "0"))
+
+# Score a fraction of the traffic with the SHADOW_ALIAS version too, off the response path.
+# 1 shadows every request, 0 does not load the challenger at all
+SHADOW_ALIAS = os.getenv("SHADOW_ALIAS", "Challenger")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+
+# Other registered models served under /models/<name>/<alias>/, loaded on first use.
+# Only the comma separated name@alias in HOSTED_MODELS are (empty serves just the default model),
+# above MODEL_MEMORY_BUDGET_MB the least recently used ones are unloaded (0 never unloads)
+HOSTED_MODELS = os.getenv("HOSTED_MODELS", "")
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
 # ENDPOINT URL
 ENDPOINT_HOST = "0.0.0.0"
 ENDPOINT_PORT = "9090"
 ENDPOINT_URL=f"http://{ENDPOINT_HOST}:{ENDPOINT_PORT}/predict"
 
+# Scored once by every newly loaded version before it serves requests
+WARMUP_TRIP = {"PULocationID": 10, "DOLocationID": 50, "trip_distance": 40}
+
+registry = Registry()
+REQUESTS = registry.counter("predict_requests_total", "HTTP requests served", ["endpoint","status","model_version"])
+REQUEST_ERRORS = registry.counter("predict_request_errors_total", "HTTP requests answered with a 4xx or 5xx status", ["endpoint","model_version"])
+REQUEST_LATENCY = registry.histogram("predict_request_duration_seconds", "End to end request latency", ["endpoint","model_version"])
+STAGE_LATENCY = registry.histogram("predict_stage_duration_seconds", "Latency of parse, prepare_features, transform, predict and serialize", ["stage","model_version"])
+BATCH_ROWS = registry.histogram("predict_batch_rows", "Rows scored per model call", ["model_version"], buckets=SIZE_BUCKETS)
+DISPATCHER_BATCHES = registry.counter("predict_dispatcher_batches_total", "Batches scored by the /predict dispatcher", ["dispatcher"])
+DISPATCHER_ROWS = registry.counter("predict_dispatcher_rows_total", "Rows scored by the /predict dispatcher", ["dispatcher"])
+CACHE_LOOKUPS = registry.counter("predict_cache_lookups_total", "Prediction cache lookups", ["result"])
+CACHE_EVICTIONS = registry.counter("predict_cache_evictions_total", "Predictions evicted from the cache")
+CACHE_SIZE = registry.gauge("predict_cache_size", "Predictions currently cached")
+SHADOW_BATCHES = registry.counter("predict_shadow_batches_total", "Batches handed to the shadow scorer", ["result"])
+SHADOW_LATENCY = registry.histogram("predict_shadow_duration_seconds", "Latency of the same batches as served by the champion and as scored by the challenger", ["role","model_version"])
+SHADOW_DELTA = registry.histogram("predict_shadow_abs_delta_minutes", "Absolute difference between challenger and champion predictions per row", ["champion_version","challenger_version"], buckets=(0.1,0.25,0.5,1,2,5,10,20,30,60))
+
+def served_version():
+    loaded = model_holder.peek()
+    return loaded.version if loaded is not None else "none"
+
+def ready():
+    # True once a model version is loaded and has scored the warm-up trip
+    return model_holder.peek() is not None
+
+def record_request(endpoint,status,seconds):
+    version = served_version()
+    REQUESTS.inc(endpoint=endpoint,status=str(status),model_version=version)
+    REQUEST_LATENCY.observe(seconds,endpoint=endpoint,model_version=version)
+    if status >= 400:
+        REQUEST_ERRORS.inc(endpoint=endpoint,model_version=version)
+
 def load_model_and_dv():
-    champion_model_uri = f"models:/{MODEL_NAME}@{MODEL_VERSION_ALIAS}"
-    champion_model = mlflow.pyfunc.load_model(champion_model_uri)
-    RUN_ID=champion_model._model_meta.run_id
-    dv_path = client.download_artifacts(RUN_ID,"dv.pkl",dst_path=".")
-    print(f"Downloading the dict vectorizer to {dv_path}")
-    with open(dv_path,'rb') as file:
-        dv = pickle.load(file)
-    return champion_model,dv
+    loaded = model_holder.get()
+    return loaded.model,loaded.dv
 
 def prepare_features(data):
     features = {}
@@ -44,19 +111,278 @@ def prepare_features(data):
     features['trip_distance'] = data['trip_distance']
     return features
 
+prediction_cache = None
+if PREDICTION_CACHE_SIZE > 0:
+    prediction_cache = PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL_SECONDS, distance_bucket=PREDICTION_CACHE_DISTANCE_BUCKET)
+
+def score(loaded,features):
+    # Vectorizes and scores a dict or a list of dicts in one call
+    BATCH_ROWS.observe(1 if isinstance(features,dict) else len(features),model_version=loaded.version)
+    if loaded.compiled is not None:
+        with STAGE_LATENCY.time(stage="predict",model_version=loaded.version):
+            return loaded.compiled.predict(features)
+    if loaded.linear is not None:
+        with STAGE_LATENCY.time(stage="predict",model_version=loaded.version):
+            return loaded.linear.predict(features)
+    with STAGE_LATENCY.time(stage="transform",model_version=loaded.version):
+        X = loaded.encoder.transform(features)
+    with STAGE_LATENCY.time(stage="predict",model_version=loaded.version):
+        return loaded.model.predict(X)
+
+def score_unrecorded(loaded,features):
+    # Same model call as score() without the serving histograms, for off-path work like
+    # shadow scoring, which records its own latency in predict_shadow_duration_seconds
+    if loaded.compiled is not None:
+        return loaded.compiled.predict(features)
+    if loaded.linear is not None:
+        return loaded.linear.predict(features)
+    return loaded.model.predict(loaded.encoder.transform(features))
+
+def predict(features):
+    loaded = model_holder.get()
+    start = time.perf_counter()
+    if prediction_cache is None:
+        predictions = score(loaded,features)
+    else:
+        predictions = prediction_cache.predict(loaded.version,features,lambda rows: score(loaded,rows))
+    if shadow is not None:
+        shadow.submit(loaded.version,[features] if isinstance(features,dict) else features,predictions,time.perf_counter() - start)
+    return predictions
+
+def predict_columns(columns):
+    # Vectorized scoring for the Arrow endpoint. The prediction cache and shadow scoring
+    # work on rows, so with either of them (or a non-linear model) rows are scored instead
+    loaded = model_holder.get()
+    if loaded.linear is None or prediction_cache is not None or shadow is not None:
+        return predict([{"PU_DO": pu_do, "trip_distance": distance} for pu_do, distance in zip(columns["PU_DO"].tolist(),columns["trip_distance"].tolist())])
+    BATCH_ROWS.observe(len(columns["PU_DO"]),model_version=loaded.version)
+    with STAGE_LATENCY.time(stage="predict",model_version=loaded.version):
+        return loaded.linear.predict_columns(columns)
+
+def warm_up(loaded):
+    # Pays for lazy imports and first-call allocations before the version is served
+    score(loaded,[prepare_features(WARMUP_TRIP)])
+
+# Models with byte-identical dv.pkl share one vectorizer
+vectorizers = VectorizerCache()
+
+# Loaded once at startup and swapped in place when the alias moves to a new version
+if MODEL_DIR:
+    client = None
+    model_holder = LocalModelHolder(MODEL_DIR, linear_fast_path=LINEAR_FAST_PATH, compiled=COMPILED_MODEL, warmup=warm_up)
+else:
+    import mlflow
+    from mlflow import MlflowClient
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    client = MlflowClient(MLFLOW_TRACKING_URI)
+    model_holder = ModelHolder(client, MODEL_NAME, MODEL_VERSION_ALIAS, poll_interval=MODEL_POLL_INTERVAL_SECONDS, linear_fast_path=LINEAR_FAST_PATH, warmup=warm_up, vectorizers=vectorizers)
+if MODEL_LOAD_ASYNC:
+    model_holder.start_in_background()
+else:
+    model_holder.start()
+
+def record_shadow(champion_version,challenger_version,deltas,champion_seconds,challenger_seconds):
+    SHADOW_LATENCY.observe(champion_seconds,role="champion",model_version=champion_version)
+    SHADOW_LATENCY.observe(challenger_seconds,role="challenger",model_version=challenger_version)
+    for delta in abs(deltas):
+        SHADOW_DELTA.observe(float(delta),champion_version=champion_version,challenger_version=challenger_version)
+
+hosted_models = None
+if HOSTED_MODELS:
+    hosted_models = {tuple(model.strip().rsplit("@",1)) for model in HOSTED_MODELS.split(",") if model.strip()}
+model_manager = ModelManager(client, poll_interval=MODEL_POLL_INTERVAL_SECONDS, linear_fast_path=LINEAR_FAST_PATH, warmup=warm_up, memory_budget_bytes=int(MODEL_MEMORY_BUDGET_MB * 1024 * 1024), allowed=hosted_models, vectorizers=vectorizers)
+model_manager.add(model_holder)
+
+# The challenger loads in the background so a missing alias never blocks the champion
+shadow = None
+if SHADOW_SAMPLE_RATE > 0 and MODEL_DIR:
+    print("Shadow scoring needs the registry, it is disabled with MODEL_DIR")
+elif SHADOW_SAMPLE_RATE > 0:
+    shadow_holder = ModelHolder(client, MODEL_NAME, SHADOW_ALIAS, poll_interval=MODEL_POLL_INTERVAL_SECONDS, linear_fast_path=LINEAR_FAST_PATH, warmup=warm_up)
+    shadow_holder.start_in_background()
+    shadow = ShadowScorer(shadow_holder, score_unrecorded, sample_rate=SHADOW_SAMPLE_RATE, max_queue_size=SHADOW_QUEUE_SIZE, on_result=record_shadow)
+
+def parse_batch(body,mimetype):
+    # A JSON array of trips, or one trip per line for application/x-ndjson
+    if mimetype == "application/x-ndjson":
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    return json.loads(body)
+
+TRIP_FIELDS = ("PULocationID","DOLocationID","trip_distance")
+
+def invalid_trip(row):
+    # Why a trip can not be scored, None when it can
+    if not isinstance(row,dict):
+        return "expected a JSON object"
+    missing = [field for field in TRIP_FIELDS if row.get(field) is None]
+    if missing:
+        return "missing " + ", ".join(missing)
+    if isinstance(row['trip_distance'],bool) or not isinstance(row['trip_distance'],(int,float)):
+        return "trip_distance must be a number"
+    return None
+
+def batch_error(rows):
+    # Checked before anything is scored, so a bad row is a 400 and not a 500 from the encoder
+    if not isinstance(rows,list) or len(rows) == 0:
+        return "Expected a non-empty JSON array of trips"
+    for i,row in enumerate(rows):
+        reason = invalid_trip(row)
+        if reason is not None:
+            return f"Invalid trip at index {i}: {reason}"
+    return None
+
+dispatcher = build_dispatcher(PREDICT_DISPATCHER, predict, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_MAX_WAIT_MS)
+
 app = Flask(__name__)
 
+@app.before_request
+def start_timer():
+    g.start = time.perf_counter()
+    if not ready() and request.endpoint in ("predict_endpoint","predict_batch_endpoint","predict_arrow_endpoint","hosted_predict_endpoint","hosted_predict_batch_endpoint"):
+        return jsonify({"error": "Model is not loaded yet"}), 503
+
+@app.after_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if endpoint != "/metrics":
+        record_request(endpoint,response.status_code,time.perf_counter() - g.start)
+    return response
+
 @app.route('/predict',methods=['POST'])
 def predict_endpoint():
+    version = served_version()
+    with STAGE_LATENCY.time(stage="parse",model_version=version):
+        data = request.get_json()
+    # Rejected before it is queued, so it never reaches a micro batch
+    reason = invalid_trip(data)
+    if reason is not None:
+        return jsonify({"error": f"Invalid trip: {reason}"}), 400
+    with STAGE_LATENCY.time(stage="prepare",model_version=version):
+        features = prepare_features(data)
+    prediction = dispatcher.submit(features)
+    result = {
+        "Duration": [float(prediction)]
+    }
+    with STAGE_LATENCY.time(stage="serialize",model_version=version):
+        return jsonify(result)
+
+@app.route('/predict/batch',methods=['POST'])
+def predict_batch_endpoint():
+    version = served_version()
+    try:
+        with STAGE_LATENCY.time(stage="parse",model_version=version):
+            rows = parse_batch(request.get_data(as_text=True),request.mimetype)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch payload: {e}"}), 400
+    error = batch_error(rows)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    with STAGE_LATENCY.time(stage="prepare",model_version=version):
+        features = [prepare_features(row) for row in rows]
+    predictions = predict(features)
+    result = {
+        "Duration": predictions.tolist()
+    }
+    with STAGE_LATENCY.time(stage="serialize",model_version=version):
+        return jsonify(result)
+
+@app.route('/predict/arrow',methods=['POST'])
+def predict_arrow_endpoint():
+    # pyarrow is only imported once a caller uses the binary protocol
+    import arrow_payload
+    version = served_version()
+    try:
+        with STAGE_LATENCY.time(stage="parse",model_version=version):
+            table = arrow_payload.read_trips(request.get_data())
+    except ValueError as e:
+        return jsonify({"error": f"Invalid Arrow payload: {e}"}), 400
+    if table.num_rows == 0:
+        return jsonify({"error": "Expected at least one trip"}), 400
+    with STAGE_LATENCY.time(stage="prepare",model_version=version):
+        columns = arrow_payload.prepare_columns(table)
+    predictions = predict_columns(columns)
+    with STAGE_LATENCY.time(stage="serialize",model_version=version):
+        return Response(arrow_payload.write_durations(predictions),content_type=arrow_payload.CONTENT_TYPE)
+
+def predict_hosted(name,alias,features):
+    # Raises ModelNotFound for models that are not hosted, ModelUnavailable when loading failed
+    return score(model_manager.get(name,alias),features)
+
+@app.errorhandler(ModelNotFound)
+def model_not_found(e):
+    return jsonify({"error": str(e)}), 404
+
+@app.errorhandler(ModelUnavailable)
+def model_unavailable(e):
+    return jsonify({"error": str(e)}), 503
+
+@app.route('/models/<name>/<alias>/predict',methods=['POST'])
+def hosted_predict_endpoint(name,alias):
     data = request.get_json()
+    reason = invalid_trip(data)
+    if reason is not None:
+        return jsonify({"error": f"Invalid trip: {reason}"}), 400
     features = prepare_features(data)
-    model,dv = load_model_and_dv()
-    X = dv.transform(features)
-    predictions = model.predict(X)
+    prediction = predict_hosted(name,alias,[features])[0]
+    return jsonify({"Duration": [float(prediction)]})
+
+@app.route('/models/<name>/<alias>/predict/batch',methods=['POST'])
+def hosted_predict_batch_endpoint(name,alias):
+    try:
+        rows = parse_batch(request.get_data(as_text=True),request.mimetype)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid batch payload: {e}"}), 400
+    error = batch_error(rows)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    predictions = predict_hosted(name,alias,[prepare_features(row) for row in rows])
+    return jsonify({"Duration": predictions.tolist()})
+
+@app.route('/models',methods=['GET'])
+def models_endpoint():
+    return jsonify(model_manager.as_dict())
+
+def stats():
     result = {
-        "Duration": predictions.tolist()
+        "dispatcher": dispatcher.name,
+        "batches": dispatcher.stats.as_dict(),
     }
-    return jsonify(result)
-    
+    if prediction_cache is not None:
+        result["cache"] = prediction_cache.as_dict()
+    if shadow is not None:
+        result["shadow"] = shadow.stats.as_dict()
+    return result
+
+def metrics_text():
+    # Totals kept by the dispatcher and the cache are copied in at scrape time
+    batches = dispatcher.stats.as_dict()
+    DISPATCHER_BATCHES.set(batches["batches"],dispatcher=dispatcher.name)
+    DISPATCHER_ROWS.set(batches["rows"],dispatcher=dispatcher.name)
+    if prediction_cache is not None:
+        cache = prediction_cache.as_dict()
+        CACHE_LOOKUPS.set(cache["hits"],result="hit")
+        CACHE_LOOKUPS.set(cache["misses"],result="miss")
+        CACHE_EVICTIONS.set(cache["evictions"])
+        CACHE_SIZE.set(cache["size"])
+    if shadow is not None:
+        shadow_stats = shadow.stats.as_dict()
+        for result in ("submitted","dropped","skipped","failed"):
+            SHADOW_BATCHES.set(shadow_stats[result],result=result)
+    return registry.render()
+
+@app.route('/ready',methods=['GET'])
+def ready_endpoint():
+    if not ready():
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True, "model_version": served_version()})
+
+@app.route('/stats',methods=['GET'])
+def stats_endpoint():
+    return jsonify(stats())
+
+@app.route('/metrics',methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics_text(),content_type=CONTENT_TYPE)
+
 if __name__== '__main__':
     app.run(debug="true",host=f"{ENDPOINT_HOST}",port=f"{ENDPOINT_PORT}")
\ No newline at end of file
@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Shares the model holder, dispatcher and feature preparation with the Flask app
+import predict
+from batching import MicroBatcher
+
+# Inference runs on a bounded pool so the event loop only handles connection I/O
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(os.cpu_count() or 1)))
+ASGI_WORKERS = int(os.getenv("ASGI_WORKERS", "1"))
+
+executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix="inference")
+
+
+async def run_inference(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, fn, *args)
+
+
+async def dispatch(features):
+    # The micro batcher's future is awaited directly: waiting requests hold no pool
+    # thread, so how many rows a batch coalesces is not capped at INFERENCE_THREADS
+    if isinstance(predict.dispatcher, MicroBatcher):
+        return await asyncio.wrap_future(predict.dispatcher.enqueue(features))
+    return await run_inference(predict.dispatcher.submit, features)
+
+
+def route_label(request: Request) -> str:
+    # The matched route template in Flask's syntax (/models/<name>/<alias>/predict), never
+    # the raw path, so clients can not create new metric series
+    route = request.scope.get("route")
+    if route is None:
+        # Older Starlette versions, like the locked 0.38, only record the endpoint
+        endpoint = request.scope.get("endpoint")
+        route = next((route for route in request.app.routes if getattr(route, "endpoint", None) is endpoint), None)
+    if route is None:
+        return "unmatched"
+    return re.sub(r"\{(\w+)(:\w+)?\}", r"<\1>", route.path)
+
+
+def instrumented(endpoint):
+    # Same request counters and latency histogram as the Flask app
+    @functools.wraps(endpoint)
+    async def wrapper(request: Request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            predict.record_request(route_label(request), status, time.perf_counter() - start)
+    return wrapper
+
+
+def not_ready() -> JSONResponse:
+    return JSONResponse({"error": "Model is not loaded yet"}, status_code=503)
+
+
+def invalid_json(e: ValueError) -> JSONResponse:
+    # Flask answers 400 for a body it can not decode, so does this app
+    return JSONResponse({"error": f"Invalid JSON body: {e}"}, status_code=400)
+
+
+@instrumented
+async def predict_endpoint(request: Request) -> JSONResponse:
+    if not predict.ready():
+        return not_ready()
+    version = predict.served_version()
+    try:
+        with predict.STAGE_LATENCY.time(stage="parse", model_version=version):
+            data = await request.json()
+    except ValueError as e:
+        return invalid_json(e)
+    reason = predict.invalid_trip(data)
+    if reason is not None:
+        return JSONResponse({"error": f"Invalid trip: {reason}"}, status_code=400)
+    with predict.STAGE_LATENCY.time(stage="prepare", model_version=version):
+        features = predict.prepare_features(data)
+    prediction = await dispatch(features)
+    result = {
+        "Duration": [float(prediction)]
+    }
+    with predict.STAGE_LATENCY.time(stage="serialize", model_version=version):
+        return JSONResponse(result)
+
+
+@instrumented
+async def predict_batch_endpoint(request: Request) -> JSONResponse:
+    if not predict.ready():
+        return not_ready()
+    version = predict.served_version()
+    body = await request.body()
+    mimetype = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        with predict.STAGE_LATENCY.time(stage="parse", model_version=version):
+            # UnicodeDecodeError is a ValueError, a body that is not UTF-8 is a 400 too
+            rows = predict.parse_batch(body.decode(), mimetype)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid batch payload: {e}"}, status_code=400)
+    error = predict.batch_error(rows)
+    if error is not None:
+        return JSONResponse({"error": error}, status_code=400)
+    with predict.STAGE_LATENCY.time(stage="prepare", model_version=version):
+        features = [predict.prepare_features(row) for row in rows]
+    predictions = await run_inference(predict.predict, features)
+    result = {
+        "Duration": predictions.tolist()
+    }
+    with predict.STAGE_LATENCY.time(stage="serialize", model_version=version):
+        return JSONResponse(result)
+
+
+@instrumented
+async def predict_arrow_endpoint(request: Request) -> Response:
+    if not predict.ready():
+        return not_ready()
+    import arrow_payload
+
+    version = predict.served_version()
+    body = await request.body()
+    try:
+        with predict.STAGE_LATENCY.time(stage="parse", model_version=version):
+            table = arrow_payload.read_trips(body)
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid Arrow payload: {e}"}, status_code=400)
+    if table.num_rows == 0:
+        return JSONResponse({"error": "Expected at least one trip"}, status_code=400)
+    with predict.STAGE_LATENCY.time(stage="prepare", model_version=version):
+        columns = arrow_payload.prepare_columns(table)
+    predictions = await run_inference(predict.predict_columns, columns)
+    with predict.STAGE_LATENCY.time(stage="serialize", model_version=version):
+        return Response(arrow_payload.write_durations(predictions), media_type=arrow_payload.CONTENT_TYPE)
+
+
+async def hosted_predict(request: Request, batch: bool) -> JSONResponse:
+    if not predict.ready():
+        return not_ready()
+    name, alias = request.path_params["name"], request.path_params["alias"]
+    if batch:
+        body = await request.body()
+        mimetype = request.headers.get("content-type", "").split(";")[0].strip()
+        try:
+            rows = predict.parse_batch(body.decode(), mimetype)
+        except ValueError as e:
+            return JSONResponse({"error": f"Invalid batch payload: {e}"}, status_code=400)
+        error = predict.batch_error(rows)
+        if error is not None:
+            return JSONResponse({"error": error}, status_code=400)
+    else:
+        try:
+            rows = [await request.json()]
+        except ValueError as e:
+            return invalid_json(e)
+        reason = predict.invalid_trip(rows[0])
+        if reason is not None:
+            return JSONResponse({"error": f"Invalid trip: {reason}"}, status_code=400)
+    features = [predict.prepare_features(row) for row in rows]
+    try:
+        predictions = await run_inference(predict.predict_hosted, name, alias, features)
+    except predict.ModelNotFound as e:
+        return JSONResponse({"error": str(e)}, status_code=404)
+    except predict.ModelUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    return JSONResponse({"Duration": [float(prediction) for prediction in predictions]})
+
+
+@instrumented
+async def hosted_predict_endpoint(request: Request) -> JSONResponse:
+    return await hosted_predict(request, batch=False)
+
+
+@instrumented
+async def hosted_predict_batch_endpoint(request: Request) -> JSONResponse:
+    return await hosted_predict(request, batch=True)
+
+
+async def models_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(predict.model_manager.as_dict())
+
+
+@instrumented
+async def ready_endpoint(request: Request) -> JSONResponse:
+    if not predict.ready():
+        return JSONResponse({"ready": False}, status_code=503)
+    return JSONResponse({"ready": True, "model_version": predict.served_version()})
+
+
+@instrumented
+async def stats_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(predict.stats())
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(predict.metrics_text(), media_type=predict.CONTENT_TYPE)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict_endpoint, methods=["POST"]),
+        Route("/predict/batch", predict_batch_endpoint, methods=["POST"]),
+        Route("/predict/arrow", predict_arrow_endpoint, methods=["POST"]),
+        Route("/models", models_endpoint, methods=["GET"]),
+        Route("/models/{name}/{alias}/predict", hosted_predict_endpoint, methods=["POST"]),
+        Route("/models/{name}/{alias}/predict/batch", hosted_predict_batch_endpoint, methods=["POST"]),
+        Route("/ready", ready_endpoint, methods=["GET"]),
+        Route("/stats", stats_endpoint, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        "predict_asgi:app",
+        host=predict.ENDPOINT_HOST,
+        port=int(predict.ENDPOINT_PORT),
+        workers=ASGI_WORKERS,
+    )
@@ -0,0 +1,133 @@
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from model_holder import LoadedModel, ModelHolder
+
+ScoreFn = Callable[[LoadedModel, List[Dict]], np.ndarray]
+# champion version, challenger version, challenger - champion per row, champion and challenger seconds
+ResultFn = Callable[[str, str, np.ndarray, float, float], Any]
+
+
+class ShadowStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.challenger_version: Optional[str] = None
+        self.submitted = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.rows = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.champion_seconds = 0.0
+        self.challenger_seconds = 0.0
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def record(self, challenger_version: str, deltas: np.ndarray, champion_seconds: float, challenger_seconds: float):
+        with self._lock:
+            self.challenger_version = challenger_version
+            self.batches += 1
+            self.rows += len(deltas)
+            self.sum_delta += float(deltas.sum())
+            self.sum_abs_delta += float(np.abs(deltas).sum())
+            self.max_abs_delta = max(self.max_abs_delta, float(np.abs(deltas).max(initial=0.0)))
+            self.champion_seconds += champion_seconds
+            self.challenger_seconds += challenger_seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            batches = self.batches or 1
+            rows = self.rows or 1
+            return {
+                "challenger_version": self.challenger_version,
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_delta": self.sum_delta / rows,
+                "mean_abs_delta": self.sum_abs_delta / rows,
+                "max_abs_delta": self.max_abs_delta,
+                "mean_champion_seconds": self.champion_seconds / batches,
+                "mean_challenger_seconds": self.challenger_seconds / batches,
+            }
+
+
+class ShadowScorer:
+    """
+    Scores a sample of the Champion's traffic with the Challenger, off the response path.
+
+    submit() only draws the sample and puts the rows and the Champion's predictions on
+    a bounded queue; a single worker thread scores them with the Challenger and records
+    the prediction deltas and both latencies. When the queue is full the batch is
+    dropped rather than slowing down the request, and batches are skipped while the
+    Challenger is not loaded (e.g. the alias does not exist yet).
+    """
+
+    def __init__(
+        self,
+        holder: ModelHolder,
+        score_fn: ScoreFn,
+        sample_rate: float = 1.0,
+        max_queue_size: int = 1000,
+        on_result: Optional[ResultFn] = None,
+    ):
+        self.holder = holder
+        self.score_fn = score_fn
+        self.sample_rate = sample_rate
+        self.on_result = on_result
+        self.stats = ShadowStats()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+
+    def submit(self, champion_version: str, rows: List[Dict], predictions: np.ndarray, seconds: float):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((champion_version, rows, predictions, seconds))
+            self.stats.count("submitted")
+        except queue.Full:
+            self.stats.count("dropped")
+
+    def join(self):
+        # Waits until everything submitted so far is scored, for tests and benchmarks
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            champion_version, rows, predictions, champion_seconds = self._queue.get()
+            try:
+                self._score(champion_version, rows, predictions, champion_seconds)
+            except Exception as e:
+                self.stats.count("failed")
+                print(f"Shadow scoring failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _score(self, champion_version: str, rows: List[Dict], predictions: np.ndarray, champion_seconds: float):
+        challenger = self.holder.peek()
+        if challenger is None:
+            self.stats.count("skipped")
+            return
+
+        start = time.perf_counter()
+        challenger_predictions = np.asarray(self.score_fn(challenger, rows), dtype=np.float64)
+        challenger_seconds = time.perf_counter() - start
+
+        deltas = challenger_predictions - np.asarray(predictions, dtype=np.float64)
+        self.stats.record(challenger.version, deltas, champion_seconds, challenger_seconds)
+        if self.on_result is not None:
+            self.on_result(champion_version, challenger.version, deltas, champion_seconds, challenger_seconds)
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+# Environment overrides per startup mode, on top of the current environment
+MODES = {
+    "registry": {"MODEL_DIR": ""},
+    "baked-pyfunc": {"COMPILED_MODEL": "0", "LINEAR_FAST_PATH": "0"},
+    "baked": {},
+}
+
+TRIP = {"PULocationID": 10, "DOLocationID": 50, "trip_distance": 40}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.02)
+    return False
+
+
+def start_once(env: dict, timeout: float) -> dict:
+    """
+    Start the ASGI app in a fresh process and time it until it answers.
+
+    listening: the port accepts connections, ready: /ready returns 200 (model loaded
+    and warmed up), first_prediction: a /predict request succeeded after that.
+    """
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    command = [sys.executable, "-m", "uvicorn", "predict_asgi:app", "--host", "127.0.0.1", "--port", str(port)]
+
+    start = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        result = {}
+        deadline = start + timeout
+        while time.perf_counter() < deadline and "listening" not in result:
+            try:
+                requests.get(f"{base}/ready", timeout=1)
+                result["listening"] = time.perf_counter() - start
+            except requests.ConnectionError:
+                time.sleep(0.02)
+        if not wait_for(f"{base}/ready", deadline):
+            raise RuntimeError(f"Server did not become ready within {timeout}s")
+        result["ready"] = time.perf_counter() - start
+
+        response = requests.post(f"{base}/predict", json=TRIP, timeout=timeout)
+        response.raise_for_status()
+        result["first_prediction"] = time.perf_counter() - start
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure container start to first prediction")
+    parser.add_argument("--model-dir", required=True, help="directory baked by bake_model.py")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--runs", default=5, type=int)
+    parser.add_argument("--timeout", default=120.0, type=float)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    report = {}
+    for mode in args.modes:
+        env = {**os.environ, "MODEL_DIR": args.model_dir, "MODEL_POLL_INTERVAL_SECONDS": "0"}
+        env.update(MODES[mode])
+        runs = [start_once(env, args.timeout) for _ in range(args.runs)]
+        report[mode] = {
+            stage: {
+                "median_seconds": statistics.median(run[stage] for run in runs),
+                "max_seconds": max(run[stage] for run in runs),
+            }
+            for stage in ["listening", "ready", "first_prediction"]
+        }
+        print(f"{mode}: ready in {report[mode]['ready']['median_seconds']:.2f}s (median of {args.runs})")
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
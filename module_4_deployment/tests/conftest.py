@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The service modules import each other as top-level modules, like in the image
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODULE_DIR)
+
+
+def bake_linear_model(model_dir):
+    # What bake_model.py writes for a linear model, without the registry
+    from sklearn.feature_extraction import DictVectorizer
+    from sklearn.linear_model import LinearRegression
+
+    from linear import LinearPredictor
+    from model_holder import LINEAR_FILENAME, METADATA_FILENAME
+
+    rows = [{"PU_DO": f"{pu}_{do}", "trip_distance": float(pu + do)} for pu in range(1, 6) for do in range(1, 6)]
+    dv = DictVectorizer()
+    X = dv.fit_transform(rows)
+    model = LinearRegression().fit(X, [row["trip_distance"] * 2 + 1 for row in rows])
+    LinearPredictor.compile(dv, model).save(os.path.join(model_dir, LINEAR_FILENAME))
+    with open(os.path.join(model_dir, METADATA_FILENAME), "w") as file:
+        json.dump({"name": "Duration-Prediction-Model", "alias": "Champion", "version": "1", "run_id": "test"}, file)
+
+
+@pytest.fixture(scope="session")
+def predict_module(tmp_path_factory):
+    # predict.py reads its settings and loads the model when it is imported
+    model_dir = tmp_path_factory.mktemp("model")
+    bake_linear_model(str(model_dir))
+    os.environ["MODEL_DIR"] = str(model_dir)
+    import predict
+
+    return predict
@@ -0,0 +1,72 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+
+import arrow_payload
+
+TRIPS = [
+    {"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0},
+    {"PULocationID": 4, "DOLocationID": 5, "trip_distance": 1.5},
+    {"PULocationID": 9, "DOLocationID": 9, "trip_distance": 0},
+]
+
+
+def stream(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def read_durations(body):
+    return pa.ipc.open_stream(body).read_all()["Duration"].to_numpy()
+
+
+def test_prepare_columns_matches_json_features():
+    # Float IDs, as pandas writes an ID column with NaN, format like integers
+    table = arrow_payload.read_trips(stream(pa.table({
+        "PULocationID": pa.array([1.0, 4.0, 9.0]),
+        "DOLocationID": pa.array([2, 5, 9], pa.int32()),
+        "trip_distance": pa.array([3, 1, 0], pa.int64()),
+    })))
+    columns = arrow_payload.prepare_columns(table)
+    assert columns["PU_DO"].tolist() == ["1_2", "4_5", "9_9"]
+    assert columns["trip_distance"].dtype == np.float64
+
+
+def test_arrow_round_trip_matches_json_batch(predict_module):
+    client = predict_module.app.test_client()
+    body = stream(pa.Table.from_pylist(TRIPS))
+    response = client.post("/predict/arrow", data=body, content_type=arrow_payload.CONTENT_TYPE)
+    assert response.status_code == 200
+    assert response.content_type == arrow_payload.CONTENT_TYPE
+
+    expected = client.post("/predict/batch", json=TRIPS).get_json()["Duration"]
+    np.testing.assert_allclose(read_durations(response.data), expected)
+
+
+@pytest.mark.parametrize("columns, reason", [
+    ({"PULocationID": [1, None, 3]}, "trip at index 1: missing PULocationID"),
+    ({"DOLocationID": [2.0, 5.0, float("nan")]}, "trip at index 2: missing DOLocationID"),
+    ({"trip_distance": [3.0, None, 1.0]}, "trip at index 1: missing trip_distance"),
+    ({"PULocationID": [1.0, 4.5, 9.0]}, "trip at index 1: PULocationID must be a whole number"),
+    ({"trip_distance": ["3", "1", "0"]}, "trip_distance must be a number"),
+    ({"DOLocationID": [True, False, True]}, "DOLocationID must be an integer"),
+])
+def test_bad_payloads_are_a_bad_request(predict_module, columns, reason):
+    table = pa.table({**{key: [row[key] for row in TRIPS] for key in arrow_payload.TRIP_COLUMNS}, **columns})
+    response = predict_module.app.test_client().post(
+        "/predict/arrow", data=stream(table), content_type=arrow_payload.CONTENT_TYPE,
+    )
+    assert response.status_code == 400
+    assert reason in response.get_json()["error"]
+
+
+def test_malformed_stream_and_missing_column(predict_module):
+    client = predict_module.app.test_client()
+    assert client.post("/predict/arrow", data=b"not arrow", content_type=arrow_payload.CONTENT_TYPE).status_code == 400
+
+    response = client.post("/predict/arrow", data=stream(pa.table({"PULocationID": [1]})),
+                           content_type=arrow_payload.CONTENT_TYPE)
+    assert response.status_code == 400
+    assert "missing columns ['DOLocationID', 'trip_distance']" in response.get_json()["error"]
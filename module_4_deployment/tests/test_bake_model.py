@@ -0,0 +1,59 @@
+import json
+import os
+import pickle
+
+import mlflow
+import numpy as np
+import pytest
+
+from bake_model import bake
+from model_holder import DV_FILENAME, LINEAR_FILENAME, METADATA_FILENAME, LocalModelHolder
+
+ROWS = [{"PU_DO": f"{pu}_{do}", "trip_distance": float(pu + do)} for pu in range(1, 6) for do in range(1, 6)]
+
+
+@pytest.fixture
+def registered_model(tmp_path):
+    # A LinearRegression and its dv.pkl behind Duration-Prediction-Model@Champion, in a local registry
+    from sklearn.feature_extraction import DictVectorizer
+    from sklearn.linear_model import LinearRegression
+
+    tracking_uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    mlflow.set_tracking_uri(tracking_uri)
+    client = mlflow.MlflowClient(tracking_uri)
+    experiment_id = client.create_experiment("bake", artifact_location=str(tmp_path / "artifacts"))
+
+    dv = DictVectorizer()
+    X = dv.fit_transform(ROWS)
+    model = LinearRegression().fit(X, [row["trip_distance"] * 2 + 1 for row in ROWS])
+    with mlflow.start_run(experiment_id=experiment_id) as run:
+        mlflow.sklearn.log_model(model, artifact_path="model")
+        dv_path = tmp_path / DV_FILENAME
+        with open(dv_path, "wb") as file:
+            pickle.dump(dv, file)
+        mlflow.log_artifact(str(dv_path))
+
+    version = mlflow.register_model(f"runs:/{run.info.run_id}/model", "Duration-Prediction-Model").version
+    client.set_registered_model_alias("Duration-Prediction-Model", "Champion", version)
+    return client, run.info.run_id, model.predict(dv.transform(ROWS))
+
+
+def test_baked_model_serves_without_the_registry(registered_model, tmp_path):
+    client, run_id, expected = registered_model
+    output = str(tmp_path / "baked")
+
+    metadata = bake(client, "Duration-Prediction-Model", "Champion", output)
+    assert (metadata["version"], metadata["run_id"]) == ("1", run_id)
+    with open(os.path.join(output, METADATA_FILENAME)) as file:
+        assert json.load(file)["version"] == "1"
+
+    # The linear fast path is baked for a linear model and is what the service loads
+    assert os.path.exists(os.path.join(output, LINEAR_FILENAME))
+    loaded = LocalModelHolder(output).start().get()
+    assert loaded.linear is not None and loaded.model is None
+    np.testing.assert_allclose(loaded.linear.predict(ROWS), expected)
+
+    # Without it, the MLflow model and dv.pkl from the same directory
+    pyfunc = LocalModelHolder(output, linear_fast_path=False).start().get()
+    assert pyfunc.linear is None and pyfunc.model is not None
+    np.testing.assert_allclose(pyfunc.model.predict(pyfunc.encoder.transform(ROWS)), expected)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def submit_concurrently(batcher, rows):
+    # One thread per request, released together so they land in the same batches
+    results = [None] * len(rows)
+    barrier = threading.Barrier(len(rows))
+
+    def submit(i):
+        barrier.wait()
+        try:
+            results[i] = batcher.submit(rows[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def doubled(calls):
+    def predict_fn(rows):
+        calls.append(len(rows))
+        if any(row["x"] < 0 for row in rows):
+            raise ValueError("negative x")
+        return [row["x"] * 2 for row in rows]
+    return predict_fn
+
+
+def test_concurrent_requests_share_batches():
+    calls = []
+    batcher = MicroBatcher(doubled(calls), max_batch_size=4, max_wait_ms=500)
+
+    results = submit_concurrently(batcher, [{"x": i} for i in range(8)])
+
+    assert results == [i * 2 for i in range(8)]
+    assert sum(calls) == 8 and max(calls) == 4 and len(calls) < 8
+    assert batcher.stats.as_dict()["rows"] == 8
+
+
+def test_partial_batch_is_flushed_at_the_deadline():
+    calls = []
+    batcher = MicroBatcher(doubled(calls), max_batch_size=64, max_wait_ms=20)
+
+    start = time.perf_counter()
+    assert batcher.submit({"x": 3}) == 6
+    assert time.perf_counter() - start < 1
+    assert calls == [1]
+
+
+def test_failing_row_only_fails_its_own_request():
+    calls = []
+    batcher = MicroBatcher(doubled(calls), max_batch_size=3, max_wait_ms=500)
+
+    results = submit_concurrently(batcher, [{"x": 1}, {"x": -1}, {"x": 2}])
+
+    # The merged batch fails, then every row is scored on its own
+    assert calls == [3, 1, 1, 1]
+    assert [results[0], results[2]] == [2, 4]
+    assert isinstance(results[1], ValueError)
+
+    with pytest.raises(ValueError):
+        batcher.submit({"x": -5})
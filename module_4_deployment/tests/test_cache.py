@@ -0,0 +1,60 @@
+import numpy as np
+
+import cache
+from cache import PredictionCache
+
+
+def trip(distance):
+    return {"PU_DO": "1_2", "trip_distance": distance}
+
+
+class Scorer:
+    def __init__(self):
+        self.rows = []
+
+    def __call__(self, rows):
+        self.rows += rows
+        return np.array([row["trip_distance"] * 10 for row in rows])
+
+
+def test_least_recently_used_prediction_is_evicted():
+    prediction_cache = PredictionCache(max_size=2, ttl_seconds=60)
+    score = Scorer()
+
+    assert prediction_cache.predict("1", [trip(1.0), trip(2.0)], score).tolist() == [10, 20]
+    # 1.0 is used again, so 2.0 is the least recently used one when 3.0 comes in
+    prediction_cache.predict("1", trip(1.0), score)
+    prediction_cache.predict("1", trip(3.0), score)
+    assert score.rows == [trip(1.0), trip(2.0), trip(3.0)]
+
+    prediction_cache.predict("1", [trip(1.0), trip(2.0)], score)
+    assert score.rows[3:] == [trip(2.0)]
+    stats = prediction_cache.as_dict()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 4, 2)
+
+
+def test_expired_predictions_are_scored_again(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    prediction_cache = PredictionCache(max_size=10, ttl_seconds=30)
+    score = Scorer()
+
+    prediction_cache.predict("1", trip(1.0), score)
+    now[0] += 29
+    prediction_cache.predict("1", trip(1.0), score)
+    assert len(score.rows) == 1
+
+    now[0] += 2
+    prediction_cache.predict("1", trip(1.0), score)
+    assert len(score.rows) == 2
+
+
+def test_new_model_version_empties_the_cache():
+    prediction_cache = PredictionCache(max_size=10, ttl_seconds=60, distance_bucket=0.5)
+    score = Scorer()
+
+    # 1.1 and 0.9 both snap to 1.0
+    assert prediction_cache.predict("1", [trip(1.1), trip(0.9)], score).tolist() == [10, 10]
+    prediction_cache.predict("2", trip(1.0), score)
+    assert score.rows == [trip(1.0), trip(1.0)]
+    assert prediction_cache.as_dict()["invalidations"] == 1
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Source of truth -> copy; the README's "Shared files" section lists the same pairs
+COPIES = [
+    ("module_6_best_practices/homework/storage.py", "module_4_deployment/homework/storage.py"),
+    ("module_6_best_practices/homework/encoder.py", "module_4_deployment/homework/encoder.py"),
+    ("module_6_best_practices/homework/linear.py", "module_4_deployment/linear.py"),
+    ("module_3_orchestration/mage-mlops/mlops/utils/models/compiled.py", "module_4_deployment/compiled.py"),
+]
+
+
+@pytest.mark.parametrize("source, copy", COPIES, ids=[copy for _, copy in COPIES])
+def test_copy_matches_its_source(source, copy):
+    with open(os.path.join(REPO_DIR, source), "rb") as file:
+        expected = file.read()
+    with open(os.path.join(REPO_DIR, copy), "rb") as file:
+        assert file.read() == expected, f"{copy} differs from {source}, copy the source over it"
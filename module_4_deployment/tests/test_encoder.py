@@ -0,0 +1,32 @@
+import numpy as np
+from sklearn.feature_extraction import DictVectorizer
+
+from encoder import FeatureEncoder
+
+
+def assert_same_matrix(actual, expected):
+    assert actual.shape == expected.shape and actual.dtype == expected.dtype
+    np.testing.assert_array_equal(actual.indptr, expected.indptr)
+    np.testing.assert_array_equal(actual.indices, expected.indices)
+    np.testing.assert_array_equal(actual.data, expected.data)
+
+
+def test_feature_encoder_matches_dict_vectorizer():
+    dv = DictVectorizer()
+    dv.fit([
+        {"PU_DO": "1_2", "trip_distance": 3.0, "store_and_fwd": True, "vendor": "A"},
+        {"PU_DO": "4_5", "trip_distance": 1.0, "passengers": 2, "vendor": "B"},
+    ])
+    rows = [
+        {"PU_DO": "1_2", "trip_distance": 3.5, "vendor": "B"},
+        # Unknown category, unknown numerical and categorical features
+        {"PU_DO": "9_9", "trip_distance": 0, "tolls": 4.5, "weather": "rain"},
+        # None, ints and bools are numerical values
+        {"trip_distance": None, "passengers": 3, "store_and_fwd": False, "PU_DO": "4_5"},
+        {"store_and_fwd": True, "passengers": np.int64(1)},
+        {},
+    ]
+
+    assert_same_matrix(FeatureEncoder(dv).transform(rows), dv.transform(rows))
+    # A single dict is one row, like a list of one
+    assert_same_matrix(FeatureEncoder(dv).transform(rows[0]), dv.transform([rows[0]]))
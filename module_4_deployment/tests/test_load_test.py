@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from load_test import LoadGenerator, Recorder, report
+
+TRIPS = [{"PULocationID": i, "DOLocationID": i + 1, "trip_distance": float(i)} for i in range(5)]
+
+
+@pytest.fixture
+def stub_server():
+    # Answers 400 to trips with PULocationID 0 and 200 to everything else
+    bodies = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            bodies.append((self.path, body))
+            trips = body if isinstance(body, list) else [body]
+            status = 400 if any(trip["PULocationID"] == 0 for trip in trips) else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", bodies
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("endpoint, batch", [
+    ("/predict", False),
+    ("/models/Duration-Prediction-Model/Champion/predict", False),
+    ("/predict/batch", True),
+    ("/models/Duration-Prediction-Model/Champion/predict/batch", True),
+])
+def test_payload_shape_follows_the_endpoint(endpoint, batch):
+    generator = LoadGenerator("http://localhost:9090", endpoint, TRIPS, batch_size=3)
+    first, second = generator.payload(), generator.payload()
+    if batch:
+        assert first == TRIPS[:3] and second == [TRIPS[3], TRIPS[4], TRIPS[0]]
+    else:
+        assert first == TRIPS[0] and second == TRIPS[3]
+
+
+def test_closed_loop_report_against_stub_server(stub_server):
+    url, bodies = stub_server
+    generator = LoadGenerator(url, "/models/Duration-Prediction-Model/Champion/predict", TRIPS)
+    generator.closed_loop(concurrency=2, duration=0.3)
+
+    result = report(generator.recorder, 0.3, 1, {"mode": "closed"})
+    assert result["requests"] == len(bodies) > 0
+    assert all(isinstance(body, dict) for _, body in bodies)
+    # Every fifth trip has PULocationID 0
+    statuses = result["statuses"]
+    assert set(statuses) == {"200", "400"} and sum(statuses.values()) == result["requests"]
+    assert result["error_rate"] == statuses["400"] / result["requests"]
+    assert result["throughput_rps"] == result["requests"] / 0.3
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"] <= result["latency_ms"]["max"]
+
+
+def test_report_without_requests():
+    result = report(Recorder(), 1.0, 1, {})
+    assert result["requests"] == 0 and result["error_rate"] == 0.0
@@ -0,0 +1,44 @@
+import pytest
+
+from metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 0.5, 1.0))
+    for value in [0.05, 0.1, 0.3, 2.0]:
+        latency.observe(value, stage="predict")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    # le is inclusive: 0.1 falls in the 0.1 bucket
+    assert lines[2:] == [
+        'latency_seconds_bucket{stage="predict",le="0.1"} 2',
+        'latency_seconds_bucket{stage="predict",le="0.5"} 3',
+        'latency_seconds_bucket{stage="predict",le="1.0"} 3',
+        'latency_seconds_bucket{stage="predict",le="+Inf"} 4',
+        'latency_seconds_sum{stage="predict"} 2.45',
+        'latency_seconds_count{stage="predict"} 4',
+    ]
+
+
+def test_labels_must_match_and_values_are_escaped():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ["endpoint"])
+    with pytest.raises(ValueError):
+        requests.inc(endpoint="/predict", status="200")
+    requests.inc(endpoint='/a"b\\c\nd')
+    assert 'requests_total{endpoint="/a\\"b\\\\c\\nd"} 1.0' in registry.render()
+
+
+def test_flask_labels_requests_with_the_route_rule(predict_module):
+    client = predict_module.app.test_client()
+    trip = {"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0}
+    for path in ["/models/foo/bar/predict", "/no/such/path/1", "/no/such/path/2"]:
+        client.post(path, json=trip)
+
+    metrics = predict_module.metrics_text()
+    # One series per route, however many paths clients send
+    assert 'endpoint="/models/<name>/<alias>/predict",status="404"' in metrics
+    assert 'endpoint="unmatched",status="404"' in metrics
+    assert "/models/foo" not in metrics and "/no/such/path" not in metrics
@@ -0,0 +1,79 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from model_holder import LoadedModel, ModelHolder
+
+
+class AliasRegistry:
+    # The alias points at self.version; raises like an unreachable registry while failing
+    def __init__(self, version="1"):
+        self.version = version
+        self.failing = False
+        self.loads = []
+
+    def get_model_version_by_alias(self, name, alias):
+        if self.failing:
+            raise ConnectionError("registry unreachable")
+        return SimpleNamespace(version=self.version, run_id=f"run-{self.version}")
+
+
+class FakeHolder(ModelHolder):
+    def _load(self, version, run_id):
+        self.client.loads.append(version)
+        # Model and vectorizer of one version, to check they are swapped together
+        return LoadedModel(self.model_name, self.alias, version, run_id,
+                           model=f"model-{version}", dv=f"dv-{version}", encoder=None)
+
+
+def test_refresh_swaps_model_and_vectorizer_when_the_alias_moves():
+    registry = AliasRegistry()
+    warmed = []
+    holder = FakeHolder(registry, "duration", "Champion", poll_interval=0, warmup=warmed.append)
+    with pytest.raises(RuntimeError):
+        holder.get()
+
+    holder.start()
+    first = holder.get()
+    assert (first.version, first.model, first.dv) == ("1", "model-1", "dv-1")
+    assert holder.refresh() is False and registry.loads == ["1"]
+
+    registry.version = "2"
+    assert holder.refresh() is True
+    second = holder.get()
+    assert (second.version, second.model, second.dv, second.run_id) == ("2", "model-2", "dv-2", "run-2")
+    # Every version is warmed up before it is served
+    assert [loaded.version for loaded in warmed] == ["1", "2"]
+    # A request that already holds the old version keeps a consistent pair
+    assert (first.model, first.dv) == ("model-1", "dv-1")
+
+
+def test_polling_picks_up_a_new_version_and_survives_registry_errors():
+    registry = AliasRegistry()
+    holder = FakeHolder(registry, "duration", "Champion", poll_interval=0.01).start()
+    try:
+        registry.failing = True
+        time.sleep(0.05)
+        assert holder.get().version == "1"
+
+        registry.version, registry.failing = "2", False
+        deadline = time.monotonic() + 2
+        while holder.get().version != "2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert holder.get().version == "2"
+    finally:
+        holder.stop()
+
+
+def test_concurrent_refreshes_load_a_version_once():
+    registry = AliasRegistry()
+    holder = FakeHolder(registry, "duration", "Champion", poll_interval=0).start()
+    registry.version = "2"
+    threads = [threading.Thread(target=holder.refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.loads == ["1", "2"]
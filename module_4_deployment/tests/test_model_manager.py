@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+import model_manager
+from model_holder import LoadedModel, ModelHolder
+from model_manager import ModelManager, ModelNotFound, ModelUnavailable
+
+
+class FakeRegistry:
+    # name -> model size in bytes; names in failing raise like an unreachable registry
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.failing = set()
+        self.loads = []
+
+    def get_model_version_by_alias(self, name, alias):
+        if name in self.failing:
+            raise ConnectionError("registry unreachable")
+        return SimpleNamespace(version="1", run_id=f"run-{name}")
+
+
+class RegistryHolder(ModelHolder):
+    def _load(self, version, run_id):
+        self.client.loads.append(self.model_name)
+        return LoadedModel(self.model_name, self.alias, version, run_id,
+                           model=b"x" * self.client.sizes[self.model_name], dv=None, encoder=None)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(model_manager, "ModelHolder", RegistryHolder)
+    return FakeRegistry({"default": 1000, "a": 1000, "b": 1000, "c": 1000})
+
+
+def manager(registry, allowed=None, memory_budget_bytes=0):
+    manager = ModelManager(registry, poll_interval=0, memory_budget_bytes=memory_budget_bytes, allowed=allowed)
+    manager.add(RegistryHolder(registry, "default", "Champion", poll_interval=0).start())
+    return manager
+
+
+def test_only_allowed_models_are_loaded(registry):
+    without_allowlist = manager(registry)
+    assert without_allowlist.get("default", "Champion").name == "default"
+    with pytest.raises(ModelNotFound):
+        without_allowlist.get("a", "Champion")
+
+    allowlisted = manager(registry, allowed={("a", "Champion")})
+    assert allowlisted.get("a", "Champion").name == "a"
+    assert allowlisted.get("a", "Champion").name == "a"
+    with pytest.raises(ModelNotFound):
+        allowlisted.get("a", "Challenger")
+    assert registry.loads == ["default", "default", "a"]
+
+
+def test_load_failure_is_unavailable_and_retried(registry):
+    hosted = manager(registry, allowed={("a", "Champion")})
+    registry.failing.add("a")
+    with pytest.raises(ModelUnavailable):
+        hosted.get("a", "Champion")
+    assert [model["name"] for model in hosted.as_dict()["models"]] == ["default"]
+
+    registry.failing.clear()
+    assert hosted.get("a", "Champion").name == "a"
+
+
+def test_least_recently_used_model_is_unloaded_over_budget(registry):
+    size = model_manager.estimate_bytes(RegistryHolder(registry, "a", "Champion", poll_interval=0).start().get())
+    registry.loads.clear()
+    # Room for three of the four models
+    hosted = manager(registry, allowed={(name, "Champion") for name in "abc"}, memory_budget_bytes=size * 3 + size // 2)
+
+    hosted.get("default", "Champion")
+    hosted.get("a", "Champion")
+    hosted.get("b", "Champion")
+    hosted.get("a", "Champion")
+    # b is now the least recently used model; the pinned default is never unloaded
+    hosted.get("c", "Champion")
+    assert [model["name"] for model in hosted.as_dict()["models"]] == ["default", "a", "c"]
+    assert hosted.evictions == 1
+
+    hosted.get("b", "Champion")
+    assert registry.loads == ["default", "a", "b", "c", "b"]
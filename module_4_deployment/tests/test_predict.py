@@ -0,0 +1,46 @@
+def test_batch_rejects_bad_rows_with_their_index(predict_module):
+    client = predict_module.app.test_client()
+    trip = {"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0}
+
+    response = client.post("/predict/batch", json=[trip, trip])
+    assert response.status_code == 200 and len(response.get_json()["Duration"]) == 2
+
+    for rows, error in [
+        ([trip, "not a trip"], "Invalid trip at index 1: expected a JSON object"),
+        ([{"PULocationID": 1, "trip_distance": 3.0}], "Invalid trip at index 0: missing DOLocationID"),
+        ([trip, trip, {**trip, "trip_distance": "far"}], "Invalid trip at index 2: trip_distance must be a number"),
+        ([], "Expected a non-empty JSON array of trips"),
+    ]:
+        response = client.post("/predict/batch", json=rows)
+        assert response.status_code == 400
+        assert response.get_json() == {"error": error}
+
+
+def test_single_trip_is_validated_before_it_is_queued(predict_module):
+    client = predict_module.app.test_client()
+
+    response = client.post("/predict", json={"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0})
+    assert response.status_code == 200
+
+    response = client.post("/predict", json={"PULocationID": 1, "DOLocationID": 2})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid trip: missing trip_distance"}
+
+
+def test_shadow_scoring_stays_out_of_the_serving_histograms(predict_module):
+    from shadow import ShadowScorer
+
+    rows = [predict_module.prepare_features({"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0})]
+    loaded = predict_module.model_holder.get()
+    before = predict_module.metrics_text()
+
+    # The challenger here is the champion itself, scored the way predict.py wires the shadow
+    scorer = ShadowScorer(predict_module.model_holder, predict_module.score_unrecorded)
+    scorer.submit(loaded.version, rows, predict_module.score(loaded, rows), 0.001)
+    scorer.join()
+
+    assert scorer.stats.rows == 1 and scorer.stats.max_abs_delta == 0.0
+    after = predict_module.metrics_text()
+    # Only the champion's own score() call above is counted
+    count = 'predict_batch_rows_count{model_version="1"}'
+    assert float(after.split(count)[1].split()[0]) == float(before.split(count)[1].split()[0]) + 1
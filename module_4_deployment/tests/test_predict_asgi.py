@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def asgi_client(predict_module):
+    from starlette.testclient import TestClient
+
+    import predict_asgi
+
+    with TestClient(predict_asgi.app) as client:
+        yield client
+
+
+def test_malformed_json_is_a_bad_request(asgi_client, predict_module):
+    flask_client = predict_module.app.test_client()
+    headers = {"Content-Type": "application/json"}
+
+    for path in ["/predict", "/models/Duration-Prediction-Model/Champion/predict"]:
+        assert asgi_client.post(path, content=b'{"PULocationID": 1,', headers=headers).status_code == 400
+        assert flask_client.post(path, data=b'{"PULocationID": 1,', headers=headers).status_code == 400
+
+    response = asgi_client.post("/predict", json={"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0})
+    assert response.status_code == 200
+
+
+def test_requests_are_labelled_with_the_route_template(asgi_client, predict_module):
+    trip = {"PULocationID": 1, "DOLocationID": 2, "trip_distance": 3.0}
+    for path in ["/models/foo/bar/predict", "/models/baz/qux/predict"]:
+        response = asgi_client.post(path, json=trip)
+        assert response.status_code == 404
+
+    metrics = predict_module.metrics_text()
+    assert 'endpoint="/models/<name>/<alias>/predict",status="404"' in metrics
+    assert "/models/foo" not in metrics and "/models/baz" not in metrics
+
+
+def test_body_that_is_not_utf8_is_a_bad_request(asgi_client):
+    headers = {"Content-Type": "application/json"}
+    for path in ["/predict/batch", "/models/Duration-Prediction-Model/Champion/predict/batch"]:
+        response = asgi_client.post(path, content=b'[{"PULocationID": "\xff"}]', headers=headers)
+        assert response.status_code == 400
+
+
+def test_micro_batches_are_not_capped_by_the_inference_pool(predict_module, monkeypatch):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    import httpx
+
+    import predict_asgi
+    from batching import MicroBatcher
+
+    batcher = MicroBatcher(predict_module.predict, max_batch_size=8, max_wait_ms=200)
+    monkeypatch.setattr(predict_module, "dispatcher", batcher)
+    monkeypatch.setattr(predict_asgi, "executor", ThreadPoolExecutor(max_workers=1))
+
+    async def send_all():
+        transport = httpx.ASGITransport(app=predict_asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            trips = [{"PULocationID": i, "DOLocationID": 2, "trip_distance": 3.0} for i in range(8)]
+            return await asyncio.gather(*(client.post("/predict", json=trip) for trip in trips))
+
+    responses = asyncio.run(send_all())
+    assert [response.status_code for response in responses] == [200] * 8
+    # All eight waited on the batcher at once, with a single inference thread
+    assert batcher.stats.max_batch_size == 8
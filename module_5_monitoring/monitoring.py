@@ -7,9 +7,7 @@ import joblib
 import psycopg2
 from sqlalchemy import create_engine
 import os
-from evidently.report import Report
-from evidently import ColumnMapping
-from evidently.metrics import ColumnDriftMetric, DatasetDriftMetric, DatasetMissingValuesMetric, ColumnQuantileMetric,ColumnSummaryMetric
+from drift import DriftEngine, split_days
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -56,20 +54,14 @@ target = "duration_min"
 num_features = ["passenger_count", "trip_distance", "fare_amount", "total_amount"]
 cat_features = ["PULocationID", "DOLocationID"]
 
-column_mapping = ColumnMapping(
-    prediction='prediction',
-    numerical_features=num_features,
-    categorical_features=cat_features,
-    target=None,
-)
-
-report = Report(metrics=[
-    ColumnDriftMetric(column_name='prediction'),
-    DatasetDriftMetric(),
-    DatasetMissingValuesMetric(),
-    ColumnQuantileMetric(column_name="fare_amount", quantile=0.5),
-    ColumnQuantileMetric(column_name="trip_distance", quantile=0.5),
-])
+# Same metrics as an Evidently Report with ColumnDriftMetric('prediction'), DatasetDriftMetric(),
+# DatasetMissingValuesMetric() and ColumnQuantileMetric(0.5) for fare_amount and trip_distance,
+# but the reference is profiled once instead of on every day
+drift_engine = DriftEngine(reference_data, prediction='prediction', num_features=num_features, cat_features=cat_features)
+
+# The whole month is scored once and split into days with one sort
+raw_data["prediction"] = model.predict(raw_data[num_features + cat_features].fillna(0))
+daily_data = split_days(raw_data, "lpep_pickup_datetime", begin, total_days)
 
 def prep_db():
     conn = psycopg2.connect(host="localhost",port=f"{PG_PORT}",user=f"{POSTGRES_USER}",dbname=f"{POSTGRES_DATABASE}",password=f"{POSTGRES_PASSWORD}")
@@ -95,26 +87,21 @@ def prep_db():
     conn.close()
 
 def calculate_metrics_postgresql(curr, i):    
-    current_data = raw_data[(raw_data.lpep_pickup_datetime >= (begin + datetime.timedelta(i))) &
-        (raw_data.lpep_pickup_datetime < (begin + datetime.timedelta(i+1)))]
-    
-    # current_data.fillna(0, inplace=True)
-    current_data["prediction"] = model.predict(current_data[num_features + cat_features].fillna(0))
+    current_data = daily_data[i]
 
-    # calculate dict
-    report.run(reference_data=reference_data, current_data=current_data, column_mapping=column_mapping)
-    result = report.as_dict()
+    # metrics for the day
+    result = drift_engine.metrics(current_data)
 
     # prediction drift
-    prediction_drift = result['metrics'][0]['result']['drift_score']
+    prediction_drift = result['prediction_drift']
     # number of drifted columns
-    num_drifted_columns = result['metrics'][1]['result']['number_of_drifted_columns']
+    num_drifted_columns = result['num_drifted_columns']
     # share of missing values
-    share_missing_values = result['metrics'][2]['result']['current']['share_of_missing_values']
+    share_missing_values = result['share_missing_values']
     # 0.5 quantile fare_amount
-    fare_amount_quantile = float(result['metrics'][3]['result']['current']['value'])
+    fare_amount_quantile = result['fare_amount_quantile']
     # 0.5 quantile trip_distance
-    trip_distance_quantile = float(result['metrics'][4]['result']['current']['value'])
+    trip_distance_quantile = result['trip_distance_quantile']
 
     print((begin + datetime.timedelta(i)), prediction_drift, num_drifted_columns, share_missing_values, fare_amount_quantile, trip_distance_quantile)
    
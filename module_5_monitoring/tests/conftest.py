@@ -0,0 +1,5 @@
+import os
+import sys
+
+# monitoring.py imports drift.py as a top-level module, so do the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from scipy.spatial import distance
+
+from drift import DRIFT_THRESHOLD, DriftEngine, split_days
+
+NUM_FEATURES = ["passenger_count", "trip_distance"]
+CAT_FEATURES = ["PULocationID"]
+
+
+def trips(rng, rows, distance_scale, locations):
+    return pd.DataFrame({
+        "prediction": rng.normal(15, 5, rows),
+        "passenger_count": rng.choice([1.0, 2.0, 3.0], rows, p=[0.7, 0.2, 0.1]),
+        "trip_distance": rng.gamma(2.0, distance_scale, rows),
+        "PULocationID": rng.choice(locations, rows),
+    })
+
+
+@pytest.fixture
+def reference():
+    # More than 1000 rows, so Evidently's defaults are Wasserstein and Jensen-Shannon
+    return trips(np.random.default_rng(1), 2000, 1.5, [1, 2, 3, 4])
+
+
+@pytest.fixture
+def current():
+    # Longer trips from other locations; prediction and passenger_count do not change
+    current = trips(np.random.default_rng(2), 500, 3.0, [3, 4, 5])
+    current.loc[:9, "trip_distance"] = np.nan
+    current.loc[10:14, "trip_distance"] = np.inf
+    return current
+
+
+def shares(reference, current):
+    # Evidently's Jensen-Shannon input: value counts over both sides' values, as shares
+    keys = sorted(set(reference) | set(current))
+    return (
+        [(reference == key).sum() / len(reference) for key in keys],
+        [(current == key).sum() / len(current) for key in keys],
+    )
+
+
+def test_drift_scores_match_scipy(reference, current):
+    engine = DriftEngine(reference, "prediction", NUM_FEATURES, CAT_FEATURES)
+    clean = current["trip_distance"].replace([np.inf, -np.inf], np.nan).dropna()
+
+    expected = {
+        "prediction": stats.wasserstein_distance(reference["prediction"], current["prediction"]) / np.std(reference["prediction"]),
+        "trip_distance": stats.wasserstein_distance(reference["trip_distance"], clean) / np.std(reference["trip_distance"]),
+        # Three values, so Jensen-Shannon even though the column is numerical
+        "passenger_count": distance.jensenshannon(*shares(reference["passenger_count"], current["passenger_count"])),
+        "PULocationID": distance.jensenshannon(*shares(reference["PULocationID"], current["PULocationID"])),
+    }
+    drift = engine.drift_by_columns(current)
+
+    assert set(drift) == set(expected)
+    for column, score in expected.items():
+        assert drift[column][0] == pytest.approx(score, rel=1e-12)
+        assert drift[column][1] == (score >= DRIFT_THRESHOLD)
+    assert {column for column, (_, drifted) in drift.items() if drifted} == {"trip_distance", "PULocationID"}
+    assert engine.drifted_columns(current) / len(drift) == 0.5
+    assert engine.column_drift(current, "prediction") == drift["prediction"][0]
+
+
+def test_no_drift_against_itself(reference):
+    engine = DriftEngine(reference, "prediction", NUM_FEATURES, CAT_FEATURES)
+    assert engine.drifted_columns(reference) == 0
+    assert all(score == pytest.approx(0, abs=1e-12) for score, _ in engine.drift_by_columns(reference).values())
+
+
+def test_missing_share_and_medians(reference, current):
+    engine = DriftEngine(reference, "prediction", NUM_FEATURES, CAT_FEATURES)
+    current = current.assign(store_and_fwd_flag=["", "N"] * 250)
+
+    metrics = engine.metrics(current, quantile_columns=("trip_distance",))
+
+    # 10 NaN and 5 inf distances, 250 empty flags, over 5 columns of 500 rows
+    assert metrics["share_missing_values"] == (10 + 5 + 250) / (5 * 500)
+    assert metrics["trip_distance_quantile"] == current["trip_distance"].quantile(0.5)
+
+
+def test_split_days():
+    data = pd.DataFrame({"pickup": pd.to_datetime(["2024-03-02 10:00", "2024-03-01 23:59", "2024-03-01 00:00", "2024-03-04 00:00"])})
+    days = split_days(data, "pickup", pd.Timestamp("2024-03-01").to_pydatetime(), 3)
+    assert [len(day) for day in days] == [2, 1, 0]
@@ -1,16 +1,37 @@
+import hashlib
+import json
 import os
 import pickle
+import sys
+import time
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from dotenv import load_dotenv
 load_dotenv()
 
 import warnings
 warnings.filterwarnings('ignore')
 
-os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv("MINIO_ENDPOINT")
-os.environ['AWS_ACCESS_KEY_ID'] = os.getenv("ACCESS_KEY")
-os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv("SECRET_KEY")
+try:
+    from .encoder import ColumnarEncoder
+    from .linear import LinearPredictor
+    from .storage import cached_input, exists, fingerprint, open_s3_writer, remove
+except ImportError:
+    from encoder import ColumnarEncoder
+    from linear import LinearPredictor
+    from storage import cached_input, exists, fingerprint, open_s3_writer, remove
+
+if os.getenv("MINIO_ENDPOINT"):
+    os.environ['MLFLOW_S3_ENDPOINT_URL'] = os.getenv("MINIO_ENDPOINT")
+    os.environ['AWS_ACCESS_KEY_ID'] = os.getenv("ACCESS_KEY")
+    os.environ['AWS_SECRET_ACCESS_KEY'] = os.getenv("SECRET_KEY")
 
 # Use below setting for local run
 S3_ENDPOINT_URL = "http://127.0.0.1:9000"
@@ -18,54 +39,396 @@ S3_ENDPOINT_URL = "http://127.0.0.1:9000"
 # Use below setting for Docker image
 # S3_ENDPOINT_URL = os.path.basename(os.getenv("MINIO_ENDPOINT")).split("//")[0]
 
+# The only input columns scoring needs, the yellow taxi files have about 20
+READ_COLUMNS = ["tpep_pickup_datetime", "tpep_dropoff_datetime", "PULocationID", "DOLocationID"]
+
+# Rides per chunk handed to the model by the dataset engine
+DATASET_BATCH_ROWS = 131_072
+
+
+@dataclass(frozen=True)
+class OutputFormat:
+    # "string": ride_id as "2023/03_123" (the default output)
+    # "triple": year, month and row_index integer columns instead of ride_id
+    ride_id: str = "string"
+    float32: bool = False
+    compression: str = "none"
+
+    def schema(self):
+        if self.ride_id == "triple":
+            fields = [("year", pa.int16()), ("month", pa.int8()), ("row_index", pa.int64())]
+        else:
+            fields = [("ride_id", pa.string())]
+        duration_type = pa.float32() if self.float32 else pa.float64()
+        return pa.schema(fields + [("predicted_duration", duration_type)])
+
+
+def output_table(year, month, index, y_pred, output_format):
+    # Built in Arrow, without a Python string per ride
+    index = pa.array(np.asarray(index, dtype=np.int64))
+    if output_format.ride_id == "triple":
+        columns = [
+            pa.array(np.full(len(index), year, dtype=np.int16)),
+            pa.array(np.full(len(index), month, dtype=np.int8)),
+            index,
+        ]
+    else:
+        columns = [pc.binary_join_element_wise(f"{year:04d}/{month:02d}_", pc.cast(index, pa.string()), "")]
+    duration_type = np.float32 if output_format.float32 else np.float64
+    columns.append(pa.array(np.asarray(y_pred, dtype=duration_type)))
+    return pa.Table.from_arrays(columns, schema=output_format.schema())
+
+
+def location_categories(values):
+    # Same values as .fillna(-1).astype("int").astype("str"), as a category: one str()
+    # per distinct location instead of one Python string per ride
+    codes, locations = pd.factorize(values.fillna(-1).astype("int"), sort=True)
+    return pd.Categorical.from_codes(codes, categories=locations.astype("str"))
+
+
 def prepare_data(df, categorical):
     df["duration"] = df.tpep_dropoff_datetime - df.tpep_pickup_datetime
     df["duration"] = df.duration.dt.total_seconds() / 60
 
     df = df[(df.duration >= 1) & (df.duration <= 60)].copy()
-    df[categorical] = df[categorical].fillna(-1).astype("int").astype("str")
+    for column in categorical:
+        df[column] = location_categories(df[column])
     return df
 
 
 def read_data(filename, categorical):
-    if S3_ENDPOINT_URL is not None:
-        options = {"client_kwargs": {"endpoint_url": S3_ENDPOINT_URL}}
-        df = pd.read_parquet(filename, storage_options=options)
+    # Remote inputs are read from the local cache, memory mapped
+    filename = cached_input(filename, s3_options(filename))
+    if "://" in filename:
+        # Input cache turned off: read it where it is, from the configured S3 endpoint
+        df = pd.read_parquet(filename, storage_options=s3_options(filename))
     else:
-        df = pd.read_parquet(filename)
+        df = pd.read_parquet(filename, memory_map=True)
 
     df = prepare_data(df, categorical)
     return df
 
 
-def save_data(df, save_path):
-    AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-    AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-    if S3_ENDPOINT_URL is not None:
-        options = {
-            "client_kwargs": {
-                "endpoint_url": S3_ENDPOINT_URL,
-                "aws_access_key_id": AWS_ACCESS_KEY_ID,
-                "aws_secret_access_key": AWS_SECRET_ACCESS_KEY,
-                "verify": False,
-            },
-        }
-
-        df.to_parquet(
-            save_path,
-            engine="pyarrow",
-            compression=None,
-            index=False,
-            storage_options=options,
+def save_data(table, save_path, compression="none"):
+    with open_file(save_path, "wb", s3_options(save_path, with_credentials=True)) as f_out:
+        pq.write_table(table, f_out, compression=compression)
+    print(f"Saved {table.num_rows} predictions to {save_path}")
+
+
+def compile_predictor(categorical, dv, model):
+    # Linear models are scored straight from their coefficients, anything else
+    # gets the vectorizer's matrix, built from the columns
+    try:
+        predictor = LinearPredictor.compile(dv, model)
+    except TypeError:
+        encoder = ColumnarEncoder(dv)
+        def predict_columns(df):
+            X_val = encoder.transform({column: df[column] for column in categorical})
+            return model.predict(X_val)
+        return predict_columns
+    return lambda df: predictor.predict_columns({column: df[column] for column in categorical})
+
+
+def predict(df, categorical, dv, model):
+    return compile_predictor(categorical, dv, model)(df)
+
+
+def open_file(path, mode, storage_options=None):
+    # s3:// and https:// are read through fsspec, which reads parquet with range requests
+    if "://" not in path:
+        return open(path, mode)
+    if path.startswith("s3://") and "w" in mode:
+        # Uploaded in parts while it is being written, with the process's pooled client
+        client_kwargs = (storage_options or {}).get("client_kwargs", {})
+        return open_s3_writer(
+            path,
+            endpoint_url=client_kwargs.get("endpoint_url"),
+            aws_access_key_id=client_kwargs.get("aws_access_key_id"),
+            aws_secret_access_key=client_kwargs.get("aws_secret_access_key"),
         )
-        print(f"Saved the file to {S3_ENDPOINT_URL} in path {save_path.split('//')[1]}")
-    else:
-        print(" Could not save to S3(Minio) because no S3_ENDPOINT_URL environment variable found!")
-        df.to_parquet(
-            save_path,
-            engine="pyarrow",
-            index=False,
+    import fsspec
+    return fsspec.open(path, mode, **(storage_options or {})).open()
+
+
+def s3_options(path, with_credentials=False):
+    if S3_ENDPOINT_URL is None or not path.startswith("s3://"):
+        return None
+    client_kwargs = {"endpoint_url": S3_ENDPOINT_URL}
+    if with_credentials:
+        client_kwargs.update(
+            aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+            verify=False,
         )
+    return {"client_kwargs": client_kwargs}
+
+
+def read_data_batches(filename, categorical, first_row_group=0):
+    """
+    Yield prepare_data() of one parquet row group at a time, reading only READ_COLUMNS.
+
+    The index keeps counting across row groups, so ride ids match read_data(), also
+    when the first first_row_group groups are skipped.
+    """
+    filename = cached_input(filename, s3_options(filename))
+    if "://" in filename:
+        f_in = open_file(filename, "rb", s3_options(filename))
+    else:
+        f_in = pa.memory_map(filename)
+    with f_in:
+        parquet_file = pq.ParquetFile(f_in)
+        offset = sum(parquet_file.metadata.row_group(i).num_rows for i in range(first_row_group))
+        for i in range(first_row_group, parquet_file.num_row_groups):
+            df = parquet_file.read_row_group(i, columns=READ_COLUMNS).to_pandas()
+            df.index += offset
+            offset += len(df)
+            yield prepare_data(df, categorical)
+
+
+def score_month_streaming(year, month, dv, model, output_format=OutputFormat(), force=False):
+    """
+    Score one parquet row group at a time; peak memory is one row group of the input
+    instead of the whole month.
+
+    Each row group is written to its own part file under <output>.parts and recorded
+    in the manifest, so a run that crashed resumes after the last completed row group.
+    The parts are then merged into the output file and removed.
+    """
+    start = time.perf_counter()
+    input_file = get_input_path(year, month)
+    output_file = get_output_path(year, month)
+    print("The input file is:" ,input_file)
+    print("The output file is:" ,output_file)
+    categorical = ["PULocationID", "DOLocationID"]
+
+    partition = partition_fingerprint(input_file, dv, model, output_format)
+    manifest = None if force else read_manifest(output_file)
+    if is_done(manifest, partition, output_file):
+        return skipped(year, month, output_file, manifest, start)
+    parts = manifest.get("parts", []) if manifest is not None and same_partition(manifest, partition) else []
+    if parts:
+        print(f"Resuming after {len(parts)} completed row groups")
+
+    predict_batch = compile_predictor(categorical, dv, model)
+    parts_dir = parts_path(output_file)
+    if "://" not in parts_dir:
+        os.makedirs(parts_dir, exist_ok=True)
+    for i, df in enumerate(read_data_batches(input_file, categorical, first_row_group=len(parts)), start=len(parts)):
+        y_pred = predict_batch(df) if not df.empty else np.empty(0)
+        part_file = f"{parts_dir}/{i:05d}.parquet"
+        with open_file(part_file, "wb", s3_options(part_file, with_credentials=True)) as f_out:
+            pq.write_table(output_table(year, month, df.index, y_pred, output_format), f_out, compression=output_format.compression)
+        parts.append({"file": part_file, "rows": len(df), "total": float(y_pred.sum())})
+        write_manifest(output_file, {**partition, "complete": False, "parts": parts})
+
+    with open_file(output_file, "wb", s3_options(output_file, with_credentials=True)) as f_out:
+        with pq.ParquetWriter(f_out, output_format.schema(), compression=output_format.compression) as writer:
+            for part in parts:
+                with open_file(part["file"], "rb", s3_options(part["file"])) as f_in:
+                    writer.write_table(pq.read_table(f_in))
+
+    rows = sum(part["rows"] for part in parts)
+    mean_duration = sum(part["total"] for part in parts) / rows if rows else float("nan")
+    write_manifest(output_file, {**partition, "complete": True, "rows": rows, "mean_duration": mean_duration})
+    remove(parts_dir, s3_options(parts_dir, with_credentials=True))
+
+    print("predicted mean duration:", mean_duration)
+    print(f"Saved {rows} predictions to {output_file}")
+    return {
+        "year": year,
+        "month": month,
+        "rows": rows,
+        "mean_duration": mean_duration,
+        "output_file": output_file,
+        "seconds": time.perf_counter() - start,
+        "skipped": False,
+    }
+
+
+def manifest_path(output_file):
+    return output_file + ".manifest.json"
+
+
+def parts_path(output_file):
+    # Row group outputs of an unfinished streaming run
+    return output_file + ".parts"
+
+
+def read_manifest(output_file):
+    path = manifest_path(output_file)
+    try:
+        with open_file(path, "rb", s3_options(path)) as f_in:
+            return json.load(f_in)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(output_file, manifest):
+    path = manifest_path(output_file)
+    data = json.dumps(manifest, indent=2).encode()
+    if "://" in path:
+        with open_file(path, "wb", s3_options(path, with_credentials=True)) as f_out:
+            f_out.write(data)
+        return
+    # Replaced in one step, so a crash never leaves half a manifest
+    with open(path + ".tmp", "wb") as f_out:
+        f_out.write(data)
+    os.replace(path + ".tmp", path)
+
+
+def model_fingerprint(dv, model):
+    return hashlib.sha256(pickle.dumps((dv, model), protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+def partition_fingerprint(input_file, dv, model, output_format):
+    # What an output partition depends on; anything else changing does not rescore it
+    return {
+        "input_file": input_file,
+        "input_fingerprint": fingerprint(input_file, s3_options(input_file)),
+        "model_fingerprint": model_fingerprint(dv, model),
+        "output_format": asdict(output_format),
+    }
+
+
+def same_partition(manifest, partition):
+    return all(manifest.get(key) == value for key, value in partition.items())
+
+
+def is_done(manifest, partition, output_file):
+    # A complete manifest only counts while its output is still there
+    return (
+        manifest is not None
+        and manifest.get("complete", False)
+        and same_partition(manifest, partition)
+        and exists(output_file, s3_options(output_file, with_credentials=True))
+    )
+
+
+def skipped(year, month, output_file, manifest, start):
+    print(f"{output_file} is up to date with its input and model, skipping")
+    return {
+        "year": year,
+        "month": month,
+        "rows": manifest["rows"],
+        "mean_duration": manifest["mean_duration"],
+        "output_file": output_file,
+        "seconds": time.perf_counter() - start,
+        "skipped": True,
+    }
+
+
+def duration_minutes(schema):
+    # Same arithmetic as prepare_data: elapsed time in seconds, then minutes
+    per_second = {"s": 1, "ms": 10 ** 3, "us": 10 ** 6, "ns": 10 ** 9}[schema.field("tpep_pickup_datetime").type.unit]
+    elapsed = pc.subtract(ds.field("tpep_dropoff_datetime"), ds.field("tpep_pickup_datetime")).cast(pa.int64())
+    return pc.divide(pc.divide(elapsed.cast(pa.float64()), float(per_second)), 60.0)
+
+
+def scan_fragment(fragment, schema, categorical, batch_rows):
+    columns = {"duration": duration_minutes(schema), **{column: ds.field(column) for column in categorical}}
+    scanner = ds.Scanner.from_fragment(
+        fragment, schema=schema, columns=columns, batch_size=batch_rows, batch_readahead=2,
+    )
+    offset = 0
+    for batch in scanner.to_batches():
+        keep = pc.fill_null(pc.and_(pc.greater_equal(batch["duration"], 1), pc.less_equal(batch["duration"], 60)), False)
+        df = batch.filter(keep).to_pandas()
+        df.index = offset + pc.indices_nonzero(keep).to_numpy().astype(np.int64)
+        offset += batch.num_rows
+        for column in categorical:
+            df[column] = location_categories(df[column])
+        yield df
+
+
+def local_input(input_file):
+    # The dataset engine reads local files, remote inputs come from the input cache
+    path = cached_input(input_file, s3_options(input_file))
+    if "://" in path:
+        raise ValueError(f"The dataset engine reads local files, set INPUT_CACHE_DIR to download {path}")
+    return path
+
+
+def scan_month(path, categorical, batch_rows=DATASET_BATCH_ROWS):
+    """
+    Yield prepared chunks of the rides in one local parquet file.
+
+    The file is scanned as an Arrow dataset: only the datetime and location columns
+    are read, the duration is computed by the scan and the 1-60 minute filter runs on
+    each scanned batch in Arrow, so pandas only ever sees batch_rows kept rides. The
+    filter is applied per batch rather than as a scanner filter to keep each ride's
+    row position in its file as the index, so ride ids match read_data().
+    """
+    dataset = ds.dataset(path, format="parquet")
+    for fragment in dataset.get_fragments():
+        yield from scan_fragment(fragment, dataset.schema, categorical, batch_rows)
+
+
+def score_months_dataset(months, dv, model, output_format=OutputFormat(), force=False, batch_rows=DATASET_BATCH_ROWS):
+    """
+    Score many months out of core, one month after the other, see scan_month().
+
+    Each month is written to its own output file (one partition per month, as with
+    the other engines) while its chunks are scored, and gets a manifest; months that
+    are already up to date are not scanned. Remote inputs are downloaded into the
+    input cache when their month comes up, so the job needs disk, not memory, and a
+    month that fails does not stop the others. Returns (results, failed) like run_range().
+    """
+    categorical = ["PULocationID", "DOLocationID"]
+    predict_batch = compile_predictor(categorical, dv, model)
+    results, failed, pending = [], [], []
+    for year, month in months:
+        start = time.perf_counter()
+        input_file = get_input_path(year, month)
+        output_file = get_output_path(year, month)
+        try:
+            partition = partition_fingerprint(input_file, dv, model, output_format)
+        except Exception as e:
+            print(f"Scoring {year:04d}-{month:02d} failed: {e!r}")
+            failed.append((year, month))
+            continue
+        manifest = None if force else read_manifest(output_file)
+        if is_done(manifest, partition, output_file):
+            results.append(skipped(year, month, output_file, manifest, start))
+        else:
+            pending.append((year, month, input_file, output_file, partition))
+
+    for year, month, input_file, output_file, partition in pending:
+        start = time.perf_counter()
+        print("The input file is:" ,input_file)
+        print("The output file is:" ,output_file)
+        rows, total = 0, 0.0
+        try:
+            # Resolved here, so a missing or failing download only fails its own month
+            path = local_input(input_file)
+            with open_file(output_file, "wb", s3_options(output_file, with_credentials=True)) as f_out:
+                with pq.ParquetWriter(f_out, output_format.schema(), compression=output_format.compression) as writer:
+                    for df in scan_month(path, categorical, batch_rows):
+                        if df.empty:
+                            continue
+                        y_pred = predict_batch(df)
+                        writer.write_table(output_table(year, month, df.index, y_pred, output_format))
+                        rows += len(df)
+                        total += float(y_pred.sum())
+        except Exception as e:
+            print(f"Scoring {year:04d}-{month:02d} failed: {e!r}")
+            failed.append((year, month))
+            continue
+
+        mean_duration = total / rows if rows else float("nan")
+        write_manifest(output_file, {**partition, "complete": True, "rows": rows, "mean_duration": mean_duration})
+        remove(parts_path(output_file), s3_options(output_file, with_credentials=True))
+        print(f"Saved {rows} predictions to {output_file}")
+        results.append({
+            "year": year,
+            "month": month,
+            "rows": rows,
+            "mean_duration": mean_duration,
+            "output_file": output_file,
+            "seconds": time.perf_counter() - start,
+            "skipped": False,
+        })
+    results.sort(key=lambda result: (result["year"], result["month"]))
+    return results, sorted(failed)
 
 
 def get_input_path(year, month):
@@ -82,35 +445,159 @@ def get_output_path(year, month):
     return output_pattern.format(year=year, month=month)
 
 
-def main(year, month):
+def load_model(model_path="model.bin"):
+    with open(model_path, "rb") as f_in:
+        return pickle.load(f_in)
+
+
+def score_month(year, month, dv, model, output_format=OutputFormat(), force=False):
+    start = time.perf_counter()
     input_file = get_input_path(year, month)
     output_file = get_output_path(year, month)
     print("The input file is:" ,input_file)
     print("The output file is:" ,output_file)
-    with open("model.bin", "rb") as f_in:
-        dv, lr = pickle.load(f_in)
     categorical = ["PULocationID", "DOLocationID"]
 
+    partition = partition_fingerprint(input_file, dv, model, output_format)
+    manifest = None if force else read_manifest(output_file)
+    if is_done(manifest, partition, output_file):
+        return skipped(year, month, output_file, manifest, start)
+
     df = read_data(input_file, categorical)
-    df["ride_id"] = f"{year:04d}/{month:02d}_" + df.index.astype("str")
 
-    dicts = df[categorical].to_dict(orient="records")
-    X_val = dv.transform(dicts)
-    y_pred = lr.predict(X_val)
+    y_pred = predict(df, categorical, dv, model)
 
     print("predicted mean duration:", y_pred.mean())
 
-    df_result = pd.DataFrame()
-    df_result["ride_id"] = df["ride_id"]
-    df_result["predicted_duration"] = y_pred
+    save_data(output_table(year, month, df.index, y_pred, output_format), output_file, output_format.compression)
+    write_manifest(output_file, {**partition, "complete": True, "rows": len(df), "mean_duration": float(y_pred.mean())})
+    # Left behind when a streaming run of this month crashed
+    remove(parts_path(output_file), s3_options(output_file, with_credentials=True))
+    return {
+        "year": year,
+        "month": month,
+        "rows": len(df),
+        "mean_duration": float(y_pred.mean()),
+        "output_file": output_file,
+        "seconds": time.perf_counter() - start,
+        "skipped": False,
+    }
+
+
+def main(year, month, streaming=False, output_format=OutputFormat(), force=False):
+    dv, lr = load_model()
+    if streaming:
+        return score_month_streaming(year, month, dv, lr, output_format, force)
+    return score_month(year, month, dv, lr, output_format, force)
+
+
+def month_range(start, end):
+    # "2023-01", "2023-12" -> [(2023, 1), ..., (2023, 12)], both ends included
+    start_year, start_month = (int(part) for part in start.split("-"))
+    end_year, end_month = (int(part) for part in end.split("-"))
+    months = []
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    if not months:
+        raise ValueError(f"{start} is after {end}")
+    return months
 
-    save_data(df_result, output_file)
+
+# Loaded once per pool process instead of once per month
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _score_month_in_worker(year, month, streaming, output_format, force):
+    dv, model = _worker_model
+    if streaming:
+        return score_month_streaming(year, month, dv, model, output_format, force)
+    return score_month(year, month, dv, model, output_format, force)
+
+
+def run_range(
+    start,
+    end,
+    workers=None,
+    model_path="model.bin",
+    streaming=False,
+    output_format=OutputFormat(),
+    force=False,
+    engine="pandas",
+    batch_rows=DATASET_BATCH_ROWS,
+):
+    """
+    Score every month from start to end ("YYYY-MM") on a pool of processes.
+
+    Each process runs read -> prepare -> predict -> write for one month at a time,
+    so at most `workers` months (or row groups with streaming) are held in memory at
+    once. A month that fails is reported and does not stop the others. Months whose
+    manifest shows they were scored from the same input and model are skipped unless
+    force is set.
+
+    engine="dataset" scores the whole range in this process with
+    score_months_dataset() instead, in chunks of batch_rows rides.
+    """
+    months = month_range(start, end)
+    if engine == "dataset":
+        dv, model = load_model(model_path)
+        return score_months_dataset(months, dv, model, output_format, force, batch_rows)
+    workers = workers or min(len(months), os.cpu_count() or 1)
+    results, failed = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as executor:
+        futures = {executor.submit(_score_month_in_worker, year, month, streaming, output_format, force): (year, month) for year, month in months}
+        for future in as_completed(futures):
+            year, month = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Scoring {year:04d}-{month:02d} failed: {e!r}")
+                failed.append((year, month))
+    results.sort(key=lambda result: (result["year"], result["month"]))
+    return results, sorted(failed)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-y", "--year", default=2023, type=int)
     parser.add_argument("-m", "--month", default=3, type=int)
+    parser.add_argument("--start", default=None, help="first month of a range, e.g. 2023-01")
+    parser.add_argument("--end", default=None, help="last month of a range, defaults to --start")
+    parser.add_argument("--workers", default=None, type=int, help="months scored in parallel, defaults to the CPU count")
+    parser.add_argument("--streaming", action="store_true", help="score one parquet row group at a time")
+    parser.add_argument("--ride-id", choices=["string", "triple"], default="string", help="triple writes year, month and row_index columns")
+    parser.add_argument("--float32", action="store_true", help="write predicted_duration as float32")
+    parser.add_argument("--compression", choices=["none", "snappy", "zstd"], default="none")
+    parser.add_argument("--force", action="store_true", help="rescore months whose manifest says they are up to date")
+    parser.add_argument("--engine", choices=["pandas", "dataset"], default="pandas", help="dataset: out-of-core Arrow dataset scan over all months")
+    parser.add_argument("--batch-rows", default=DATASET_BATCH_ROWS, type=int, help="rides per chunk with --engine dataset")
     args = parser.parse_args()
-    main(year=args.year, month=args.month)
+    output_format = OutputFormat(ride_id=args.ride_id, float32=args.float32, compression=args.compression)
+    if args.start or args.engine == "dataset":
+        start = time.perf_counter()
+        first = args.start or f"{args.year:04d}-{args.month:02d}"
+        results, failed = run_range(
+            first,
+            args.end or first,
+            workers=args.workers,
+            streaming=args.streaming,
+            output_format=output_format,
+            force=args.force,
+            engine=args.engine,
+            batch_rows=args.batch_rows,
+        )
+        rows = sum(result["rows"] for result in results)
+        skipped_months = sum(result["skipped"] for result in results)
+        print(f"Scored {len(results)} months ({skipped_months} already up to date), {rows} rides in {time.perf_counter() - start:.1f}s")
+        if failed:
+            print("Failed months:", ", ".join(f"{year:04d}-{month:02d}" for year, month in failed))
+            sys.exit(1)
+    else:
+        main(year=args.year, month=args.month, streaming=args.streaming, output_format=output_format, force=args.force)
     print("Batch.py executed successfully")
@@ -0,0 +1,208 @@
+"""
+Benchmark batch scoring on synthetic yellow taxi files.
+
+Generates parquet files shaped like the real trip data (same columns and types,
+some missing locations and out of range durations) at each size, then runs every
+mode in a fresh process so peak RSS belongs to that mode alone:
+
+    python benchmark.py --sizes 1M 10M 50M --results benchmark_results.jsonl
+
+prepare: read the file and prepare_data(); full: score_month(); streaming:
+score_month_streaming(); dataset: score_months_dataset(), the Arrow engine of
+run_range(). Each run appends one JSON line to the results file with the git
+commit, so runs before and after a change can be compared.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MODES = ["prepare", "full", "streaming", "dataset"]
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCHEMA = pa.schema([
+    ("VendorID", pa.int32()),
+    ("tpep_pickup_datetime", pa.timestamp("us")),
+    ("tpep_dropoff_datetime", pa.timestamp("us")),
+    ("passenger_count", pa.float64()),
+    ("trip_distance", pa.float64()),
+    ("RatecodeID", pa.float64()),
+    ("store_and_fwd_flag", pa.string()),
+    ("PULocationID", pa.float64()),
+    ("DOLocationID", pa.float64()),
+    ("payment_type", pa.int64()),
+    ("fare_amount", pa.float64()),
+    ("extra", pa.float64()),
+    ("mta_tax", pa.float64()),
+    ("tip_amount", pa.float64()),
+    ("tolls_amount", pa.float64()),
+    ("improvement_surcharge", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("congestion_surcharge", pa.float64()),
+    ("airport_fee", pa.float64()),
+])
+
+
+def parse_size(size):
+    # "1M" -> 1_000_000, "500k" -> 500_000, "2000" -> 2000
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = size[-1].lower()
+    if suffix in multipliers:
+        return int(float(size[:-1]) * multipliers[suffix])
+    return int(size)
+
+
+def synthetic_trips(rows, rng, year=2023, month=1):
+    start = np.datetime64(f"{year:04d}-{month:02d}-01", "us")
+    pickup = start + rng.integers(0, 28 * 24 * 3600, rows).astype("timedelta64[s]")
+    # Mostly 1-60 minute rides, a few shorter and longer ones that prepare_data drops
+    minutes = rng.gamma(2.0, 7.0, rows)
+    outliers = rng.random(rows) < 0.03
+    minutes[outliers] = rng.choice([0.5, 90.0], outliers.sum()) * rng.uniform(0.5, 1.5, outliers.sum())
+    dropoff = pickup + (minutes * 60_000_000).astype("timedelta64[us]")
+    distance = np.round(minutes * rng.uniform(0.1, 0.5, rows), 2)
+    fare = np.round(3.0 + 2.5 * distance, 2)
+
+    def locations():
+        values = rng.integers(1, 266, rows).astype(np.float64)
+        values[rng.random(rows) < 0.01] = np.nan
+        return values
+
+    return pa.table({
+        "VendorID": rng.integers(1, 3, rows).astype(np.int32),
+        "tpep_pickup_datetime": pickup,
+        "tpep_dropoff_datetime": dropoff,
+        "passenger_count": rng.integers(1, 5, rows).astype(np.float64),
+        "trip_distance": distance,
+        "RatecodeID": np.ones(rows),
+        "store_and_fwd_flag": np.where(rng.random(rows) < 0.01, "Y", "N"),
+        "PULocationID": locations(),
+        "DOLocationID": locations(),
+        "payment_type": rng.integers(1, 5, rows),
+        "fare_amount": fare,
+        "extra": np.full(rows, 1.0),
+        "mta_tax": np.full(rows, 0.5),
+        "tip_amount": np.round(fare * rng.uniform(0, 0.25, rows), 2),
+        "tolls_amount": np.zeros(rows),
+        "improvement_surcharge": np.full(rows, 1.0),
+        "total_amount": fare + 2.5,
+        "congestion_surcharge": np.full(rows, 2.5),
+        "airport_fee": np.zeros(rows),
+    }, schema=SCHEMA)
+
+
+def generate_trips(path, rows, seed=42, chunk_rows=1_000_000, row_group_size=131_072):
+    # Written chunk by chunk, so 50M rows need no more memory than 1M
+    rng = np.random.default_rng(seed)
+    with pq.ParquetWriter(path + ".tmp", SCHEMA) as writer:
+        for start in range(0, rows, chunk_rows):
+            writer.write_table(synthetic_trips(min(chunk_rows, rows - start), rng), row_group_size=row_group_size)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def run_mode(mode, input_file, output_dir):
+    # Runs in a fresh interpreter, started by benchmark()
+    import batch
+
+    os.environ["INPUT_FILE_PATTERN"] = input_file
+    os.environ["OUTPUT_FILE_PATTERN"] = os.path.join(output_dir, f"predictions_{mode}.parquet")
+    categorical = ["PULocationID", "DOLocationID"]
+
+    start = time.perf_counter()
+    if mode == "prepare":
+        df = pd.read_parquet(input_file)
+        read_seconds = time.perf_counter() - start
+        rows = len(df)
+        batch.prepare_data(df, categorical)
+        result = {"read_seconds": read_seconds, "prepare_seconds": time.perf_counter() - start - read_seconds}
+    elif mode == "dataset":
+        dv, model = batch.load_model(os.path.join(HERE, "model.bin"))
+        rows = pq.ParquetFile(input_file).metadata.num_rows
+        results, failed = batch.score_months_dataset([(2023, 1)], dv, model, force=True)
+        if failed:
+            raise RuntimeError(f"Scoring {input_file} with the dataset engine failed")
+        result = {"scored_rows": results[0]["rows"]}
+    else:
+        dv, model = batch.load_model(os.path.join(HERE, "model.bin"))
+        score = batch.score_month_streaming if mode == "streaming" else batch.score_month
+        rows = pq.ParquetFile(input_file).metadata.num_rows
+        result = {"scored_rows": score(2023, 1, dv, model, force=True)["rows"]}
+    seconds = time.perf_counter() - start
+
+    result.update(
+        mode=mode,
+        rows=rows,
+        seconds=seconds,
+        rows_per_second=rows / seconds,
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(input_file, mode, output_dir):
+    command = [sys.executable, os.path.abspath(__file__), "--run", mode, "--input", input_file, "--output-dir", output_dir]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=HERE)
+    if completed.returncode < 0:
+        # SIGKILL is usually the OOM killer, e.g. the full read at 50M rows
+        return {"mode": mode, "error": f"killed by signal {-completed.returncode}"}
+    if completed.returncode != 0:
+        return {"mode": mode, "error": (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch scoring on synthetic trip data")
+    parser.add_argument("--sizes", nargs="+", default=["1M", "10M", "50M"])
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--data-dir", default="benchmark_data", help="synthetic inputs are generated once and kept here")
+    parser.add_argument("--results", default="benchmark_results.jsonl")
+    parser.add_argument("--run", choices=MODES, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--input", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output-dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.input, args.output_dir)))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    output_dir = os.path.abspath(os.path.join(args.data_dir, "predictions"))
+    os.makedirs(output_dir, exist_ok=True)
+    commit = git_commit()
+    for size in args.sizes:
+        rows = parse_size(size)
+        input_file = os.path.abspath(os.path.join(args.data_dir, f"synthetic_{rows}.parquet"))
+        if not os.path.exists(input_file):
+            print(f"Generating {rows} trips into {input_file}")
+            generate_trips(input_file, rows)
+        for mode in args.modes:
+            result = {"commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "size": rows}
+            result.update(benchmark(input_file, mode, output_dir))
+            if "error" in result:
+                print(f"{rows:>10} {mode:<10} failed: {result['error']}")
+            else:
+                print(f"{rows:>10} {mode:<10} {result['rows_per_second']:>12,.0f} rows/s {result['peak_rss_mb']:>8.0f} MB")
+            with open(args.results, "a") as file:
+                file.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
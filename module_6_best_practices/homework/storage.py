@@ -0,0 +1,296 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# S3 rejects parts smaller than 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+
+_clients: Dict[Tuple, object] = {}
+_clients_lock = threading.Lock()
+_buckets = set()
+
+
+def get_client(endpoint_url=None, aws_access_key_id=None, aws_secret_access_key=None, max_pool_connections=16):
+    # One boto3 client per endpoint and key for the whole process: clients are
+    # thread safe and keep their HTTP connections open between files
+    key = (endpoint_url, aws_access_key_id, aws_secret_access_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+            client = _clients[key] = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                config=Config(max_pool_connections=max_pool_connections),
+            )
+        return client
+
+
+def ensure_bucket(client, bucket):
+    # Checked once per process instead of before every upload
+    if (id(client), bucket) in _buckets:
+        return
+    try:
+        client.head_bucket(Bucket=bucket)
+    except Exception:
+        client.create_bucket(Bucket=bucket)
+        print("Created bucket", bucket)
+    _buckets.add((id(client), bucket))
+
+
+def split_s3_path(path):
+    bucket, _, key = path[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """
+    Writable file object that uploads to S3 while it is being written.
+
+    Every part_size bytes become one part of a multipart upload, sent on a pool
+    of max_concurrency threads while the caller keeps writing. At most
+    max_concurrency parts are in flight, so memory stays bounded. close()
+    uploads the rest and completes the upload; leaving the with block on an
+    exception aborts it, so no partial object is ever visible. Files smaller
+    than one part are sent with a single put_object.
+    """
+
+    def __init__(self, client, bucket, key, part_size=DEFAULT_PART_SIZE, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id: Optional[str] = None
+        self._futures: List = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        self._check_closed()
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+        return len(data)
+
+    def _check_closed(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+    def _submit_part(self, body):
+        if self._upload_id is None:
+            self._upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)["UploadId"]
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        # Blocks while max_concurrency parts are uploading
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        future = self._executor.submit(self._upload_part, part_number, body)
+        self._futures.append(future)
+
+    def _upload_part(self, part_number, body):
+        try:
+            response = self.client.upload_part(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=part_number, Body=body,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self._slots.release()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id, MultipartUpload={"Parts": parts},
+                )
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            self._shutdown()
+            super().close()
+
+    def abort(self):
+        if self._upload_id is not None:
+            self._shutdown()
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer = bytearray()
+        super().close()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def open_s3_writer(path, endpoint_url=None, aws_access_key_id=None, aws_secret_access_key=None, **kwargs):
+    client = get_client(endpoint_url, aws_access_key_id, aws_secret_access_key)
+    bucket, key = split_s3_path(path)
+    ensure_bucket(client, bucket)
+    return S3MultipartWriter(client, bucket, key, **kwargs)
+
+
+def info_fingerprint(info):
+    etag = info.get("ETag") or info.get("etag") or ""
+    return f"{etag}\n{info.get('size')}"
+
+
+def fingerprint(path, storage_options=None):
+    # ETag and size of a remote object, size and modification time of a local file
+    if "://" not in path:
+        stat = os.stat(path)
+        return f"{stat.st_size}\n{stat.st_mtime_ns}"
+    import fsspec
+    fs, remote = fsspec.core.url_to_fs(path, **(storage_options or {}))
+    return info_fingerprint(fs.info(remote))
+
+
+def exists(path, storage_options=None):
+    if "://" not in path:
+        return os.path.exists(path)
+    import fsspec
+    fs, remote = fsspec.core.url_to_fs(path, **(storage_options or {}))
+    return fs.exists(remote)
+
+
+def remove(path, storage_options=None):
+    # A file or a directory, local or remote; missing paths are ignored
+    if "://" not in path:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+        return
+    import fsspec
+    fs, remote = fsspec.core.url_to_fs(path, **(storage_options or {}))
+    if fs.exists(remote):
+        fs.rm(remote, recursive=True)
+
+
+class InputCache:
+    """
+    Content-addressed on-disk cache for remote input files.
+
+    A file is stored under sha256(url, ETag, size) of the remote object, so a
+    changed file at the same URL gets a new entry and the old one ages out.
+    Hits cost one HEAD request instead of a download. Entries are used in
+    least recently used order and removed once the cache is over max_bytes.
+    Downloads go to a temporary file first, so concurrent runs never see a
+    partial entry.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, url, info):
+        return hashlib.sha256(f"{url}\n{info_fingerprint(info)}".encode()).hexdigest()
+
+    def get(self, url, storage_options=None):
+        import fsspec
+        fs, remote = fsspec.core.url_to_fs(url, **(storage_options or {}))
+        info = fs.info(remote)
+        extension = os.path.splitext(remote)[1]
+        path = os.path.join(self.directory, self.key(url, info) + extension)
+        if os.path.exists(path):
+            # Marks the entry as recently used
+            os.utime(path)
+            self.hits += 1
+            return path
+
+        self.misses += 1
+        os.makedirs(self.directory, exist_ok=True)
+        fd, download = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            # One streaming GET, not range requests
+            fs.get_file(remote, download)
+            os.replace(download, path)
+        except BaseException:
+            os.unlink(download)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def default_input_cache():
+    # INPUT_CACHE_DIR="" turns the cache off
+    directory = os.getenv("INPUT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "taxi-inputs"))
+    if not directory:
+        return None
+    return InputCache(directory, int(float(os.getenv("INPUT_CACHE_MAX_GB", "5")) * 1024 ** 3))
+
+
+def cached_input(path, storage_options=None, cache=None):
+    # Local path of a remote input, downloaded once; local paths are returned as
+    # they are, and so are URLs when fsspec isn't installed
+    cache = cache or default_input_cache()
+    if cache is None or "://" not in path:
+        return path
+    try:
+        import fsspec  # noqa: F401
+    except ImportError:
+        return path
+    return cache.get(path, storage_options)
@@ -1,6 +1,9 @@
+import os
 import module_6_best_practices.homework.batch as  b
 from datetime import datetime
 import pandas as pd
+import numpy as np
+import pytest
 
 def dt(hour, minute, second=0):
     return datetime(2023, 1, 1, hour, minute, second)
@@ -36,4 +39,212 @@ def test_read_data():
     assert len(actual_records)==len(expected_records)
 
     for i in range(len(expected_records)):
-        assert actual_records[i]==expected_records[i]
\ No newline at end of file
+        assert actual_records[i]==expected_records[i]
+
+def test_prepare_data_location_categories():
+    locations = pd.Series([5.0, None, 132.0, 5.0, 264.0])
+    categories = b.location_categories(locations)
+
+    assert categories.dtype == "category"
+    assert list(categories) == locations.fillna(-1).astype("int").astype("str").tolist()
+
+
+def test_read_data_without_cache_uses_s3_endpoint(monkeypatch):
+    # INPUT_CACHE_DIR="" reads the remote file directly, still from the configured endpoint
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", "http://localhost:4566")
+    monkeypatch.setenv("INPUT_CACHE_DIR", "")
+    calls = []
+    def read_parquet(path, **kwargs):
+        calls.append((path, kwargs))
+        return pd.DataFrame({
+            "PULocationID": [1.0], "DOLocationID": [2.0],
+            "tpep_pickup_datetime": [dt(1, 1)], "tpep_dropoff_datetime": [dt(1, 10)],
+        })
+    monkeypatch.setattr(b.pd, "read_parquet", read_parquet)
+
+    assert len(b.read_data("s3://nyc-duration/in/2023-01.parquet", ["PULocationID", "DOLocationID"])) == 1
+    assert calls == [(
+        "s3://nyc-duration/in/2023-01.parquet",
+        {"storage_options": {"client_kwargs": {"endpoint_url": "http://localhost:4566"}}},
+    )]
+
+
+def test_month_range():
+    assert b.month_range("2022-11", "2023-02") == [(2022, 11), (2022, 12), (2023, 1), (2023, 2)]
+    assert b.month_range("2023-03", "2023-03") == [(2023, 3)]
+
+
+def test_run_range(tmp_path, monkeypatch):
+    # Two months of local parquet files scored on a process pool
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "output_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime"]
+    for month in [1, 2]:
+        df = pd.DataFrame([(1, 1, dt(1, 2), dt(1, 10)), (3, 4, dt(1, 2), dt(1, 30))], columns=columns)
+        df.to_parquet(tmp_path / f"input_2023-{month:02d}.parquet")
+
+    model_path = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+    results, failed = b.run_range("2023-01", "2023-03", workers=2, model_path=model_path)
+
+    assert failed == [(2023, 3)]
+    assert [(result["year"], result["month"], result["rows"]) for result in results] == [(2023, 1, 2), (2023, 2, 2)]
+    output = pd.read_parquet(tmp_path / "output_2023-02.parquet")
+    assert output["ride_id"].tolist() == ["2023/02_0", "2023/02_1"]
+
+
+def test_streaming_matches_full_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime", "fare_amount"]
+    data = [
+        (None, None, dt(1, 1), dt(1, 10), 1.0),
+        (1, 1, dt(1, 2), dt(1, 10), 2.0),
+        (1, None, dt(1, 2, 0), dt(1, 2, 59), 3.0),
+        (3, 4, dt(1, 2, 0), dt(2, 2, 1), 4.0),
+        (130, 205, dt(1, 5), dt(1, 25), 5.0),
+    ]
+    # Two rows per row group, so filtered rows fall in different groups
+    pd.DataFrame(data, columns=columns).to_parquet(tmp_path / "input_2023-01.parquet", row_group_size=2)
+    model_path = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+    monkeypatch.chdir(os.path.dirname(model_path))
+
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "full.parquet"))
+    b.main(2023, 1)
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "streaming.parquet"))
+    b.main(2023, 1, streaming=True)
+
+    full = pd.read_parquet(tmp_path / "full.parquet")
+    streaming = pd.read_parquet(tmp_path / "streaming.parquet")
+    assert streaming["ride_id"].tolist() == ["2023/01_0", "2023/01_1", "2023/01_4"]
+    pd.testing.assert_frame_equal(full, streaming)
+
+
+def test_output_table_formats():
+    y_pred = np.array([12.5, 20.25])
+
+    default = b.output_table(2023, 3, [0, 7], y_pred, b.OutputFormat())
+    assert default.to_pydict() == {"ride_id": ["2023/03_0", "2023/03_7"], "predicted_duration": [12.5, 20.25]}
+
+    compact = b.output_table(2023, 3, [0, 7], y_pred, b.OutputFormat(ride_id="triple", float32=True))
+    assert compact.schema == b.OutputFormat(ride_id="triple", float32=True).schema()
+    assert compact.to_pydict() == {"year": [2023, 2023], "month": [3, 3], "row_index": [0, 7], "predicted_duration": [12.5, 20.25]}
+
+
+def test_streaming_resumes_and_skips_done_months(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "output_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime"]
+    data = [(i, i + 1, dt(1, 2), dt(1, 10 + i)) for i in range(6)]
+    pd.DataFrame(data, columns=columns).to_parquet(tmp_path / "input_2023-01.parquet", row_group_size=2)
+    dv, model = b.load_model(os.path.join(os.path.dirname(__file__), "..", "model.bin"))
+
+    scored = []
+    compile_predictor = b.compile_predictor
+    def crash_on_third_row_group(categorical, dv, model):
+        predict_batch = compile_predictor(categorical, dv, model)
+        def predict(df):
+            if len(scored) == 2:
+                raise RuntimeError("worker died")
+            scored.append(df.index.tolist())
+            return predict_batch(df)
+        return predict
+    monkeypatch.setattr(b, "compile_predictor", crash_on_third_row_group)
+
+    with pytest.raises(RuntimeError):
+        b.score_month_streaming(2023, 1, dv, model)
+    scored.clear()
+    result = b.score_month_streaming(2023, 1, dv, model)
+    # Only the last row group is scored again
+    assert scored == [[4, 5]] and result["rows"] == 6 and not result["skipped"]
+    monkeypatch.setattr(b, "compile_predictor", compile_predictor)
+    assert not os.path.exists(tmp_path / "output_2023-01.parquet.parts")
+    output = pd.read_parquet(tmp_path / "output_2023-01.parquet")
+    assert output["ride_id"].tolist() == [f"2023/01_{i}" for i in range(6)]
+
+    # Both modes write the same output, so either one skips it
+    assert b.score_month_streaming(2023, 1, dv, model)["skipped"]
+    assert b.score_month(2023, 1, dv, model)["skipped"]
+    assert not b.score_month(2023, 1, dv, model, force=True)["skipped"]
+    # A new input file is scored again
+    pd.DataFrame(data[:4], columns=columns).to_parquet(tmp_path / "input_2023-01.parquet")
+    assert b.score_month(2023, 1, dv, model)["rows"] == 4
+
+
+def test_full_read_clears_crashed_parts_and_missing_output_is_rescored(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "output_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime"]
+    data = [(i, i + 1, dt(1, 2), dt(1, 10 + i)) for i in range(4)]
+    pd.DataFrame(data, columns=columns).to_parquet(tmp_path / "input_2023-01.parquet", row_group_size=2)
+    dv, model = b.load_model(os.path.join(os.path.dirname(__file__), "..", "model.bin"))
+    output_file = tmp_path / "output_2023-01.parquet"
+
+    # What a streaming run that crashed after its first row group leaves behind
+    os.makedirs(b.parts_path(str(output_file)))
+    (tmp_path / "output_2023-01.parquet.parts" / "00000.parquet").write_bytes(b"stale")
+
+    assert b.score_month(2023, 1, dv, model)["rows"] == 4
+    assert not os.path.exists(b.parts_path(str(output_file)))
+    assert b.score_month(2023, 1, dv, model)["skipped"]
+
+    # A complete manifest without its output does not count
+    os.remove(output_file)
+    assert not b.score_month(2023, 1, dv, model)["skipped"]
+    assert len(pd.read_parquet(output_file)) == 4
+
+
+def test_dataset_engine_matches_pandas_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime", "fare_amount"]
+    data = [
+        (None, None, dt(1, 1), dt(1, 10), 1.0),
+        (1, 1, dt(1, 2), dt(1, 10), 2.0),
+        (1, None, dt(1, 2, 0), dt(1, 2, 59), 3.0),
+        (3, 4, dt(1, 2, 0), dt(2, 2, 1), 4.0),
+        (130, 205, dt(1, 5), dt(1, 25), 5.0),
+        (7, 3, dt(1, 5), dt(1, 6), 6.0),
+        (None, 9, dt(1, 5), None, 7.0),
+    ]
+    for month in [1, 2]:
+        pd.DataFrame(data[month - 1:], columns=columns).to_parquet(tmp_path / f"input_2023-{month:02d}.parquet", row_group_size=2)
+    model_path = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "pandas_{year:04d}-{month:02d}.parquet"))
+    expected, _ = b.run_range("2023-01", "2023-02", workers=1, model_path=model_path)
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "dataset_{year:04d}-{month:02d}.parquet"))
+    # Chunks smaller than a month, and row groups of two rows
+    results, failed = b.run_range("2023-01", "2023-02", model_path=model_path, engine="dataset", batch_rows=3)
+
+    assert failed == [] and [r["rows"] for r in results] == [r["rows"] for r in expected] == [4, 3]
+    for month in [1, 2]:
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(tmp_path / f"dataset_2023-{month:02d}.parquet"),
+            pd.read_parquet(tmp_path / f"pandas_2023-{month:02d}.parquet"),
+        )
+    assert all(r["skipped"] for r in b.run_range("2023-01", "2023-02", model_path=model_path, engine="dataset")[0])
+
+
+def test_dataset_engine_failing_month_does_not_stop_the_others(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "S3_ENDPOINT_URL", None)
+    monkeypatch.setenv("INPUT_FILE_PATTERN", str(tmp_path / "input_{year:04d}-{month:02d}.parquet"))
+    monkeypatch.setenv("OUTPUT_FILE_PATTERN", str(tmp_path / "output_{year:04d}-{month:02d}.parquet"))
+    columns = ["PULocationID", "DOLocationID", "tpep_pickup_datetime", "tpep_dropoff_datetime"]
+    for month in [1, 2, 3]:
+        pd.DataFrame([(1, 2, dt(1, 2), dt(1, 10))], columns=columns).to_parquet(tmp_path / f"input_2023-{month:02d}.parquet")
+    cached_input = b.cached_input
+    def cached_input_failing_february(path, storage_options=None):
+        if path.endswith("2023-02.parquet"):
+            raise OSError("download failed")
+        return cached_input(path, storage_options)
+    monkeypatch.setattr(b, "cached_input", cached_input_failing_february)
+    model_path = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+
+    results, failed = b.run_range("2023-01", "2023-03", model_path=model_path, engine="dataset")
+
+    assert failed == [(2023, 2)]
+    assert [(r["month"], r["rows"]) for r in results] == [(1, 1), (3, 1)]
+    assert b.read_manifest(str(tmp_path / "output_2023-03.parquet"))["complete"]
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+import pyarrow.parquet as pq
+
+import module_6_best_practices.homework.batch as b
+from module_6_best_practices.homework.benchmark import SCHEMA, generate_trips, parse_size
+
+
+def test_parse_size():
+    assert [parse_size(size) for size in ["1M", "50M", "500k", "2000"]] == [1_000_000, 50_000_000, 500_000, 2000]
+
+
+def test_generated_trips_look_like_yellow_taxi_data(tmp_path):
+    path = generate_trips(str(tmp_path / "trips.parquet"), 25_000, chunk_rows=10_000, row_group_size=5_000)
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.schema_arrow == SCHEMA
+    assert parquet_file.metadata.num_rows == 25_000 and parquet_file.num_row_groups == 5
+
+    df = parquet_file.read().to_pandas()
+    prepared = b.prepare_data(df, ["PULocationID", "DOLocationID"])
+    # Some rides are outside 1-60 minutes and some locations are missing, like the real files
+    assert 0.9 * len(df) < len(prepared) < 0.99 * len(df)
+    assert (prepared["PULocationID"] == "-1").any()
+
+
+def test_batch_imports_without_minio_settings():
+    # benchmark.py imports batch in a fresh interpreter, which must work without MinIO
+    env = {key: value for key, value in os.environ.items() if key not in ("MINIO_ENDPOINT", "ACCESS_KEY", "SECRET_KEY")}
+    homework = os.path.dirname(os.path.abspath(b.__file__))
+    result = subprocess.run([sys.executable, "-c", "import batch"], cwd=homework, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
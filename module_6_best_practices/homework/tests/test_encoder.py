@@ -0,0 +1,69 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction import DictVectorizer
+
+from module_6_best_practices.homework.encoder import ColumnarEncoder
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+
+
+def load_model():
+    with open(MODEL_PATH, "rb") as f_in:
+        return pickle.load(f_in)
+
+
+def assert_same_matrix(actual, expected):
+    expected = expected.tocsr()
+    assert actual.shape == expected.shape
+    np.testing.assert_array_equal(actual.indptr, expected.indptr)
+    np.testing.assert_array_equal(actual.indices, expected.indices)
+    np.testing.assert_array_equal(actual.data, expected.data)
+
+
+def test_columnar_encoder_matches_dict_vectorizer():
+    dv, _ = load_model()
+    # Location ids beyond the training vocabulary exercise the unknown-category path
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        "PULocationID": rng.integers(-1, 400, 10_000).astype("str"),
+        "DOLocationID": rng.integers(-1, 400, 10_000).astype("str"),
+    })
+
+    actual = ColumnarEncoder(dv).transform({c: df[c] for c in df})
+
+    assert_same_matrix(actual, dv.transform(df.to_dict(orient="records")))
+
+
+def test_columnar_encoder_numerical_and_unknown_features():
+    rows = [
+        {"PU_DO": "1_2", "trip_distance": 1.5},
+        {"PU_DO": "2_3", "trip_distance": 0.0},
+    ]
+    dv = DictVectorizer().fit(rows)
+    new_rows = [
+        {"PU_DO": "2_3", "trip_distance": 0.0, "fare": 3.0},
+        {"PU_DO": "9_9", "trip_distance": 4.0, "fare": 1.0},
+        {"PU_DO": "1_2", "trip_distance": 2.5, "fare": 2.0},
+    ]
+    df = pd.DataFrame(new_rows)
+
+    actual = ColumnarEncoder(dv).transform({c: df[c] for c in df})
+
+    # Explicit zeros are kept, the unknown category and the unknown feature are dropped
+    assert_same_matrix(actual, dv.transform(new_rows))
+
+
+def test_columnar_encoder_category_columns():
+    dv, _ = load_model()
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "PULocationID": rng.integers(-1, 400, 5_000).astype("str"),
+        "DOLocationID": rng.integers(-1, 400, 5_000).astype("str"),
+    })
+
+    actual = ColumnarEncoder(dv).transform({c: df[c].astype("category") for c in df})
+
+    assert_same_matrix(actual, dv.transform(df.to_dict(orient="records")))
@@ -0,0 +1,92 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.linear_model import Lasso
+
+import module_6_best_practices.homework.batch as b
+from module_6_best_practices.homework.linear import LinearPredictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "model.bin")
+
+
+def load_model():
+    with open(MODEL_PATH, "rb") as f_in:
+        return pickle.load(f_in)
+
+
+def random_trips(n):
+    # Location ids beyond the training vocabulary exercise the unknown-category path
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        "PULocationID": rng.integers(-1, 400, n).astype("str"),
+        "DOLocationID": rng.integers(-1, 400, n).astype("str"),
+    })
+
+
+def test_linear_predictor_matches_sklearn():
+    dv, lr = load_model()
+    df = random_trips(10_000)
+    expected = lr.predict(dv.transform(df.to_dict(orient="records")))
+
+    predictor = LinearPredictor.compile(dv, lr)
+
+    np.testing.assert_allclose(predictor.predict_columns({c: df[c] for c in df}), expected, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose(predictor.predict(df.head(100).to_dict(orient="records")), expected[:100], rtol=1e-12, atol=1e-9)
+
+
+def test_linear_predictor_numerical_features():
+    rows = [
+        {"PU_DO": "1_2", "trip_distance": 1.5},
+        {"PU_DO": "2_3", "trip_distance": 7.0},
+        {"PU_DO": "1_2", "trip_distance": 3.2},
+        {"PU_DO": "5_5", "trip_distance": 0.4},
+    ]
+    dv = DictVectorizer()
+    X = dv.fit_transform(rows).toarray()
+    model = Lasso(alpha=0.01).fit(X, [5.0, 20.0, 9.0, 2.0])
+    new_rows = [{"PU_DO": "2_3", "trip_distance": 2.0}, {"PU_DO": "9_9", "trip_distance": 4.0}]
+    expected = model.predict(dv.transform(new_rows).toarray())
+
+    predictor = LinearPredictor.compile(dv, model)
+    columns = pd.DataFrame(new_rows)
+
+    np.testing.assert_allclose(predictor.predict(new_rows), expected)
+    np.testing.assert_allclose(predictor.predict_columns({c: columns[c] for c in columns}), expected)
+
+
+def test_linear_predictor_save_and_load(tmp_path):
+    dv, lr = load_model()
+    df = random_trips(1_000)
+    predictor = LinearPredictor.compile(dv, lr)
+
+    path = str(tmp_path / "model.npz")
+    predictor.save(path)
+    loaded = LinearPredictor.load(path)
+
+    np.testing.assert_array_equal(
+        loaded.predict_columns({c: df[c] for c in df}),
+        predictor.predict_columns({c: df[c] for c in df}),
+    )
+
+
+def test_batch_predict_uses_same_predictions():
+    dv, lr = load_model()
+    df = random_trips(1_000)
+    categorical = ["PULocationID", "DOLocationID"]
+    expected = lr.predict(dv.transform(df[categorical].to_dict(orient="records")))
+
+    np.testing.assert_allclose(b.predict(df, categorical, dv, lr), expected, rtol=1e-12, atol=1e-9)
+
+
+def test_linear_predictor_category_columns():
+    dv, lr = load_model()
+    df = random_trips(10_000)
+    predictor = LinearPredictor.compile(dv, lr)
+
+    expected = predictor.predict_columns({c: df[c] for c in df})
+    actual = predictor.predict_columns({c: df[c].astype("category") for c in df})
+
+    np.testing.assert_array_equal(actual, expected)
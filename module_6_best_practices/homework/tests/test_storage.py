@@ -0,0 +1,101 @@
+import io
+import sys
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from module_6_best_practices.homework.storage import MIN_PART_SIZE, InputCache, S3MultipartWriter, cached_input
+
+
+class InMemoryS3:
+    # The part of the boto3 S3 client the writer uses
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        assert all(len(parts[n]) >= MIN_PART_SIZE for n in numbers[:-1])
+        self.objects[(Bucket, Key)] = b"".join(parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+
+
+def test_multipart_writer_streams_parquet():
+    client = InMemoryS3()
+    df = pd.DataFrame({"ride_id": [f"2023/01_{i}" for i in range(1_000_000)], "predicted_duration": 1.5})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    with S3MultipartWriter(client, "bucket", "out.parquet", part_size=MIN_PART_SIZE, max_concurrency=2) as f_out:
+        with pq.ParquetWriter(f_out, table.schema, compression="none") as writer:
+            for batch in table.to_batches(max_chunksize=100_000):
+                writer.write_table(pa.Table.from_batches([batch]))
+
+    body = client.objects[("bucket", "out.parquet")]
+    assert len(body) > 2 * MIN_PART_SIZE
+    assert pq.read_table(io.BytesIO(body)).equals(table)
+
+
+def test_small_file_is_one_put_and_errors_abort():
+    client = InMemoryS3()
+    with S3MultipartWriter(client, "bucket", "small", part_size=MIN_PART_SIZE) as f_out:
+        f_out.write(b"abc")
+    assert client.objects[("bucket", "small")] == b"abc"
+
+    with pytest.raises(RuntimeError):
+        with S3MultipartWriter(client, "bucket", "failed", part_size=MIN_PART_SIZE) as f_out:
+            f_out.write(b"x" * (MIN_PART_SIZE + 1))
+            raise RuntimeError("scoring failed")
+    assert ("bucket", "failed") not in client.objects
+    assert client.aborted == ["upload-0"] and not client.uploads
+
+
+def test_input_cache_downloads_once_and_evicts(tmp_path):
+    fsspec = pytest.importorskip("fsspec")
+    fs = fsspec.filesystem("memory")
+    fs.pipe("/inputs/2023-01.parquet", b"a" * 100)
+    cache = InputCache(str(tmp_path / "cache"), max_bytes=150)
+
+    first = cache.get("memory://inputs/2023-01.parquet")
+    assert cache.get("memory://inputs/2023-01.parquet") == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert open(first, "rb").read() == b"a" * 100
+
+    # A changed remote file is a new entry; over max_bytes the older entry goes
+    fs.pipe("/inputs/2023-01.parquet", b"c" * 120)
+    changed = cache.get("memory://inputs/2023-01.parquet")
+    assert changed != first and open(changed, "rb").read() == b"c" * 120
+    assert [path for _, _, path in cache.entries()] == [changed]
+    fs.rm("/inputs", recursive=True)
+
+
+def test_cached_input_without_fsspec_returns_the_url(tmp_path, monkeypatch):
+    # Images without fsspec read URLs directly, as before the cache existed
+    monkeypatch.setitem(sys.modules, "fsspec", None)
+    cache = InputCache(str(tmp_path / "cache"), max_bytes=150)
+    url = "https://example.com/yellow_tripdata_2023-01.parquet"
+    assert cached_input(url, cache=cache) == url
+    assert cached_input("data/2023-01.parquet", cache=cache) == "data/2023-01.parquet"
+    assert (cache.hits, cache.misses) == (0, 0)